@@ -0,0 +1,70 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+# Compare glworb filtering with the TextIndex and FieldIndex
+# against a linear scan over the same glworbs. Uses synthetic
+# glworbs so no redis is needed. benchmarks is not installed,
+# run from the repository root:
+#
+#     python3 -m benchmarks.glworb_filter --glworbs 100000
+
+import argparse
+import random
+import timeit
+import uuid
+from dss_ui.search import TextIndex, FieldIndex, Query
+
+words = ["scan", "page", "chapter", "plate", "index", "cover", "spine",
+         "verso", "recto", "figure", "table", "appendix", "preface"]
+
+def synthetic_glworbs(amount, seed=0):
+    rand = random.Random(seed)
+    glworbs = {}
+    for i in range(amount):
+        key = "glworb:{}".format(uuid.UUID(int=rand.getrandbits(128)))
+        fields = {"chapter" : str(rand.randint(1, 40)),
+                  "page" : str(i),
+                  "source" : "{}_{}".format(rand.choice(words), rand.randint(1, 500)),
+                  "binary_key" : "binary:{}".format(uuid.UUID(int=rand.getrandbits(128))),
+                  "note" : " ".join(rand.choice(words) for _ in range(4))}
+        glworbs[key] = fields
+    return glworbs
+
+def document(key, fields):
+    # similar in shape to data_models.pretty_format
+    return key + "\n" + "\n".join("    {}: {}".format(k, v) for k, v in sorted(fields.items()))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--glworbs", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    glworbs = synthetic_glworbs(args.glworbs)
+    documents = {key : document(key, fields) for key, fields in glworbs.items()}
+    text_index = TextIndex()
+    field_index = FieldIndex()
+    def build_indexes():
+        for key, text in documents.items():
+            text_index.add(key, text)
+            field_index.add(key, glworbs[key])
+    build = timeit.timeit(build_indexes, number=1)
+    print("{} glworbs, indexes built in {:.2f}s".format(len(documents), build))
+
+    queries = ["appendix", "plate_12", "chapter: 7 cover", "ix", "nomatch",
+               "chapter=7", "page>=99000", "source~plate has:note cover"]
+    print("{:<30} {:>8} {:>12} {:>12}".format("query", "matches", "linear ms", "index ms"))
+    for query_text in queries:
+        query = Query(query_text)
+        linear = lambda: {key for key, text in documents.items() if query.matches(glworbs[key], text)}
+        indexed = lambda: query.search(text_index, field_index)
+        assert linear() == indexed(), query_text
+        linear_ms = min(timeit.repeat(linear, number=1, repeat=args.repeat)) * 1000
+        indexed_ms = min(timeit.repeat(indexed, number=1, repeat=args.repeat)) * 1000
+        print("{:<30} {:>8} {:>12.1f} {:>12.1f}".format(query_text, len(indexed()), linear_ms, indexed_ms))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+# Compare ways of resizing a camera sized jpeg:
+#
+#   loaded:    decode at full size, then resize
+#   thumbnail: Image.thumbnail on the unloaded image, as
+#              dss_ui.images.bytes_resized does. thumbnail
+#              drafts jpegs to a reduced scale itself
+#   draft_box: an explicit draft to twice the target and a
+#              box filter before the final lanczos step
+#
+# Run from the repository root:
+#
+#     python3 -m benchmarks.image_ingest --width 6000 --height 4000
+
+import argparse
+import io
+import timeit
+from PIL import Image as PImage
+from benchmarks.sources import synthetic_source
+
+def loaded(contents, size):
+    img = PImage.open(io.BytesIO(contents))
+    img.load()
+    img.thumbnail((size, size), PImage.LANCZOS)
+    return img.size
+
+def thumbnail(contents, size):
+    img = PImage.open(io.BytesIO(contents))
+    img.thumbnail((size, size), PImage.LANCZOS)
+    return img.size
+
+def draft_box(contents, size):
+    img = PImage.open(io.BytesIO(contents))
+    img.draft("RGB", (2 * size, 2 * size))
+    if max(img.size) > 2 * size:
+        img.thumbnail((2 * size, 2 * size), PImage.BOX)
+    img.thumbnail((size, size), PImage.LANCZOS)
+    return img.size
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    contents = synthetic_source(args.width, args.height)
+    print("source {}x{} jpeg, {} bytes".format(args.width, args.height, len(contents)))
+    for size in args.sizes:
+        for name, path in [("loaded", loaded), ("thumbnail", thumbnail), ("draft_box", draft_box)]:
+            seconds = min(timeit.repeat(lambda: path(contents, size), number=1, repeat=args.repeat))
+            print("{:>5} {:<10} {:8.2f} ms".format(size, name, seconds * 1000))
+
+if __name__ == "__main__":
+    main()
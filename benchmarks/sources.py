@@ -0,0 +1,18 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+# Source images shared by the image benchmarks
+
+import io
+from PIL import Image as PImage
+
+def synthetic_source(width, height):
+    """Return jpeg bytes of a width by height image"""
+    # noise compresses poorly, similar in size to a photo
+    img = PImage.merge("RGB", [PImage.effect_noise((width, height), 64 + 32 * i) for i in range(3)])
+    file = io.BytesIO()
+    img.save(file, "JPEG", quality=90)
+    return file.getvalue()
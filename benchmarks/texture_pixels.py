@@ -0,0 +1,64 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+# Compare the cpu side of building a texture from a resized
+# image:
+#
+#   encoded: encode to jpeg and decode again, as passing the
+#            file to CoreImage(file, ext="jpg") did
+#   pixels:  take the raw buffer, as dss_ui.image_pixels does
+#            for Texture.blit_buffer
+#
+# Decoding and resizing the source is common to both and is
+# shown separately. The texture upload is also the same and
+# needs a gl context, so it is not measured. Run from the
+# repository root:
+#
+#     python3 -m benchmarks.texture_pixels --width 4000 --height 3000
+
+import argparse
+import io
+import timeit
+from PIL import Image as PImage
+from benchmarks.sources import synthetic_source
+
+def resized(contents, size):
+    img = PImage.open(io.BytesIO(contents))
+    img.thumbnail((size, size), PImage.LANCZOS)
+    return img
+
+def encoded_path(img):
+    file = io.BytesIO()
+    img.save(file, "JPEG")
+    file.seek(0)
+    decoded = PImage.open(file)
+    return decoded.convert("RGB").tobytes()
+
+def pixels_path(img):
+    return img.convert("RGB").tobytes()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    contents = synthetic_source(args.width, args.height)
+    print("source {}x{} jpeg, {} bytes".format(args.width, args.height, len(contents)))
+    for size in args.sizes:
+        # decoding and resizing the source is common to both
+        seconds = min(timeit.repeat(lambda: resized(contents, size), number=1, repeat=args.repeat))
+        print("{:>5} {:<8} {:8.2f} ms".format(size, "resize", seconds * 1000))
+        img = resized(contents, size)
+        img.load()
+        for name, path in [("encoded", encoded_path), ("pixels", pixels_path)]:
+            seconds = min(timeit.repeat(lambda: path(img), number=1, repeat=args.repeat))
+            print("{:>5} {:<8} {:8.2f} ms".format(size, name, seconds * 1000))
+
+if __name__ == "__main__":
+    main()
@@ -14,16 +14,21 @@ import os
 import shutil
 import roman
 import atexit
+import threading
+import bisect
+import collections
+import concurrent.futures
+import multiprocessing
 import argparse
+import logging
 from functools import lru_cache
 from kivy.app import App
 from kivy.lang import Builder
 from kivy.uix.image import Image
-from kivy.core.image import Image as CoreImage
 from kivy.core.window import Window
 from kivy.config import Config
 from kivy.graphics.vertex_instructions import Rectangle
-from kivy.graphics import Color, Line, Ellipse, InstructionGroup
+from kivy.graphics import Color, Line, Ellipse, Mesh, InstructionGroup
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.scatter import Scatter
@@ -47,6 +52,8 @@ from kivy.uix.accordion import Accordion, AccordionItem
 from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelItem
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.slider import Slider
+from kivy.uix.widget import Widget
+from kivy.properties import NumericProperty
 from kivy.graphics.texture import Texture
 from PIL import Image as PImage
 from lxml import etree
@@ -57,10 +64,125 @@ import colour
 from ma_cli import data_models
 from ma_wip import visualizations
 from lings import ruling, pipeling
-
-r_ip, r_port = data_models.service_connection()
-binary_r = redis.StrictRedis(host=r_ip, port=r_port)
-redis_conn = redis.StrictRedis(host=r_ip, port=r_port, decode_responses=True)
+from .search import TextIndex, FieldIndex, Query
+from .images import image_pixels, cached_resized, bytes_resized, placeholder_resized, glworb_resized, file_resized, worker_init
+
+logger = logging.getLogger(__name__)
+
+class CountingConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that counts its checkouts"""
+    def __init__(self, *args, **kwargs):
+        self.count_lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        super(CountingConnectionPool, self).__init__(*args, **kwargs)
+
+    def get_connection(self, *args, **kwargs):
+        connection = super(CountingConnectionPool, self).get_connection(*args, **kwargs)
+        with self.count_lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return connection
+
+    def release(self, connection):
+        super(CountingConnectionPool, self).release(connection)
+        with self.count_lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+class RedisConnections(object):
+    """Shared, bounded redis connection pools created on
+    first use, one for binary replies and one for decoded
+    replies. Nothing connects until a client is used, so
+    importing the module does not touch the network. stats
+    reports the pools' settings and checkout counts."""
+    def __init__(self, max_connections=32, timeout=20, health_check_interval=30):
+        self.max_connections = max_connections
+        # seconds to wait for a free connection
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.settings = None
+        # decode_responses : pool
+        self.pools = {}
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def configure(self, host=None, port=None, unix_socket_path=None):
+        self.disconnect()
+        self.settings = {"host" : host, "port" : port, "unix_socket_path" : unix_socket_path}
+
+    def connection_settings(self):
+        if self.settings is None:
+            r_ip, r_port = data_models.service_connection()
+            self.settings = {"host" : r_ip, "port" : r_port, "unix_socket_path" : None}
+        return self.settings
+
+    def pool(self, decode_responses=False):
+        with self.lock:
+            try:
+                return self.pools[decode_responses]
+            except KeyError:
+                pass
+            settings = self.connection_settings()
+            pool_settings = {"max_connections" : self.max_connections,
+                             "timeout" : self.timeout,
+                             "health_check_interval" : self.health_check_interval,
+                             "decode_responses" : decode_responses}
+            if settings["unix_socket_path"]:
+                pool_settings["connection_class"] = redis.UnixDomainSocketConnection
+                pool_settings["path"] = settings["unix_socket_path"]
+            else:
+                pool_settings["host"] = settings["host"]
+                pool_settings["port"] = settings["port"]
+                pool_settings["socket_keepalive"] = True
+            pool = CountingConnectionPool(**pool_settings)
+            self.pools[decode_responses] = pool
+            return pool
+
+    def client(self, decode_responses=False):
+        try:
+            return self.clients[decode_responses]
+        except KeyError:
+            client = redis.StrictRedis(connection_pool=self.pool(decode_responses))
+            self.clients[decode_responses] = client
+            return client
+
+    def stats(self):
+        """Return {"binary"/"text" : pool stats} for the
+        pools created so far"""
+        stats = {}
+        with self.lock:
+            pools = dict(self.pools)
+        for decode_responses, pool in pools.items():
+            with pool.count_lock:
+                stats["text" if decode_responses else "binary"] = {"max_connections" : self.max_connections,
+                                                                   "timeout" : self.timeout,
+                                                                   "client" : decode_responses in self.clients,
+                                                                   "checkouts" : pool.checkouts,
+                                                                   "in_use" : pool.in_use,
+                                                                   "peak_in_use" : pool.peak_in_use}
+        return stats
+
+    def disconnect(self):
+        with self.lock:
+            for pool in self.pools.values():
+                pool.disconnect()
+            self.pools = {}
+            self.clients = {}
+
+class LazyRedis(object):
+    """Stands in for a redis client from connections"""
+    def __init__(self, connections, decode_responses=False):
+        self.connections = connections
+        self.decode_responses = decode_responses
+
+    def __getattr__(self, name):
+        return getattr(self.connections.client(self.decode_responses), name)
+
+connections = RedisConnections()
+binary_r = LazyRedis(connections)
+redis_conn = LazyRedis(connections, decode_responses=True)
 
 Config.read('config.ini')
 
@@ -84,7 +206,7 @@ kv = """
         width:self.parent.width
         height:self.parent.height
         effect_cls:ScrollEffect
-        GridLayout:
+        ThumbnailStrip:
             canvas:
                 Color:
                     rgba: 0, 0, 0, 0.5
@@ -92,13 +214,8 @@ kv = """
                     pos: self.pos
                     size: self.size
             id: image_grid
-            rows: 1
             size_hint_y: None
             size_hint_x: None
-            #size:self.parent.size
-            #width:3000
-            spacing: 0, 0
-            padding: 0, 0
 <GlworbRecycleView>:
     viewclass: 'GlworbLabel'
     RecycleBoxLayout:
@@ -173,9 +290,124 @@ class RuleSymbols(object):
     # is <type>
     # between int1,int2
 
+class Regions(object):
+    """Ordered set of [x, y, x2, y2] regions that keeps
+    their bounding rectangle.
+
+    Regions are keyed by tuple, so membership and removal
+    do not scan and a region is only kept once, in the
+    order it was first added for xml output. Adding a
+    region extends the rectangle, removing one only forces
+    a rescan on next use if the region was on its edge.
+    """
+    def __init__(self, regions=()):
+        # (x, y, x2, y2) : region as added
+        self.regions = collections.OrderedDict()
+        self.rectangle = None
+        self.stale = False
+        self.extend(regions)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __iter__(self):
+        return iter(self.regions.values())
+
+    def __getitem__(self, index):
+        return list(self.regions.values())[index]
+
+    def __contains__(self, region):
+        try:
+            return tuple(region) in self.regions
+        except TypeError:
+            return False
+
+    def __eq__(self, other):
+        if isinstance(other, Regions):
+            return list(self.regions) == list(other.regions)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Regions({})".format(list(self.regions.values()))
+
+    def extend_rectangle(self, region):
+        if self.stale:
+            return
+        rect = self.rectangle
+        if rect is None:
+            self.rectangle = [region[0], region[1], region[2], region[3]]
+            return
+        if region[0] < rect[0]:
+            rect[0] = region[0]
+        if region[1] < rect[1]:
+            rect[1] = region[1]
+        if region[2] > rect[2]:
+            rect[2] = region[2]
+        if region[3] > rect[3]:
+            rect[3] = region[3]
+
+    def shrink_rectangle(self, region):
+        rect = self.rectangle
+        if self.stale or rect is None:
+            return
+        if (region[0] == rect[0] or region[1] == rect[1] or
+                region[2] == rect[2] or region[3] == rect[3]):
+            self.stale = True
+
+    def bounds(self):
+        """Return bounding rectangle as [x, y, x2, y2], each
+        None if there are no regions"""
+        if self.stale:
+            self.rectangle = None
+            self.stale = False
+            for region in self:
+                self.extend_rectangle(region)
+        if self.rectangle is None:
+            return [None, None, None, None]
+        return list(self.rectangle)
+
+    def append(self, region):
+        key = tuple(region)
+        if key in self.regions:
+            return
+        self.regions[key] = region
+        self.extend_rectangle(region)
+
+    def extend(self, regions):
+        for region in regions:
+            self.append(region)
+
+    def remove(self, region):
+        try:
+            region = self.regions.pop(tuple(region))
+        except KeyError:
+            raise ValueError("{} not in regions".format(region))
+        self.shrink_rectangle(region)
+
+    def discard(self, region):
+        try:
+            self.remove(region)
+        except ValueError:
+            pass
+
+    def clear(self):
+        self.regions.clear()
+        self.rectangle = None
+        self.stale = False
+
+def to_regions(regions):
+    if isinstance(regions, Regions):
+        return regions
+    return Regions(regions)
+
 @attr.s
 class Group(object):
-    regions = attr.ib(default=attr.Factory(list))
+    # converted on assignment too, so the bounding
+    # rectangle is kept for replaced regions
+    regions = attr.ib(default=attr.Factory(Regions), converter=to_regions,
+                      on_setattr=attr.setters.convert)
     color = attr.ib(default=None)
     name = attr.ib(default="")
     hide = attr.ib(default=False)
@@ -329,25 +561,106 @@ class Group(object):
     def region_rectangle(self):
         """Return bounding rectangle of
         all regions"""
-        min_x = None
-        min_y = None
-        max_x = None
-        max_y = None
-
-        for region in self.regions:
-            if min_x is None or region[0] < min_x:
-                min_x = region[0]
-
-            if min_y is None or region[1] < min_y:
-                min_y = region[1]
-
-            if max_x is None or region[2] > max_x:
-                max_x = region[2]
-
-            if max_y is None or region[3] > max_y:
-                max_y = region[3]
-
-        return [min_x, min_y, max_x, max_y]
+        return self.regions.bounds()
+
+class GroupSpatialIndex(object):
+    """Uniform grid over group bounding rectangles for
+    finding the group at a point without checking every
+    group.
+
+    Cells are col_width by row_height, usually the grid
+    spacing of the working image, and each group is listed
+    in every cell its bounding rectangle overlaps. Groups
+    are kept in the order they were added, when several
+    contain a point the last added is returned, matching a
+    scan of app.groups.
+    """
+    def __init__(self, col_width=50, row_height=50):
+        self.col_width = col_width
+        self.row_height = row_height
+        # (col, row) : {id(group) : group}
+        self.cells = collections.defaultdict(dict)
+        # id(group) : (order, group, indexed rectangle)
+        self.entries = {}
+        self.order = 0
+
+    def cell(self, x, y):
+        return (int(x // self.col_width), int(y // self.row_height))
+
+    def rectangle_cells(self, rect):
+        first_col, first_row = self.cell(rect[0], rect[1])
+        last_col, last_row = self.cell(rect[2], rect[3])
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                yield (col, row)
+
+    def add(self, group):
+        if id(group) in self.entries:
+            self.update(group)
+            return
+        self.order += 1
+        self.entries[id(group)] = (self.order, group, None)
+        self.update(group)
+
+    def remove(self, group):
+        try:
+            _, _, rect = self.entries.pop(id(group))
+        except KeyError:
+            return
+        self.unlist(group, rect)
+
+    def unlist(self, group, rect):
+        if rect is None:
+            return
+        for cell in self.rectangle_cells(rect):
+            groups = self.cells[cell]
+            groups.pop(id(group), None)
+            if not groups:
+                del self.cells[cell]
+
+    def update(self, group):
+        """Relist group after its regions changed"""
+        try:
+            order, _, old_rect = self.entries[id(group)]
+        except KeyError:
+            return
+        rect = group.region_rectangle()
+        if None in rect:
+            rect = None
+        if rect == old_rect:
+            return
+        self.unlist(group, old_rect)
+        if rect is not None:
+            for cell in self.rectangle_cells(rect):
+                self.cells[cell][id(group)] = group
+        self.entries[id(group)] = (order, group, rect)
+
+    def resize(self, col_width, row_height):
+        col_width = max(col_width, 1)
+        row_height = max(row_height, 1)
+        if (col_width, row_height) == (self.col_width, self.row_height):
+            return
+        self.col_width = col_width
+        self.row_height = row_height
+        self.cells.clear()
+        entries = list(self.entries.values())
+        self.entries = {}
+        for order, group, _ in entries:
+            self.entries[id(group)] = (order, group, None)
+            self.update(group)
+
+    def group_at(self, points):
+        """Return the last added group whose bounding
+        rectangle contains any of points or None"""
+        found = None
+        found_order = 0
+        for x, y in points:
+            for group in self.cells.get(self.cell(x, y), {}).values():
+                order = self.entries[id(group)][0]
+                if order > found_order and group.bounding_contains_point(x, y):
+                    found = group
+                    found_order = order
+        return found
 
 @attr.s
 class Part(object):
@@ -385,9 +698,12 @@ class ClickableFileChooserListView(FileChooserListView):
             if clicked_file.endswith(".jpg"):
                 img = self.app.file_binary(clicked_file)
                 self.app.thumbs_info.add_thumb(img)
-                self.app.thumbnails.add_widget(img, index=len(self.app.thumbnails.children))
+                self.app.thumbnails.add_thumb(img, index=0)
             elif clicked_file.endswith(".xml"):
                 xml = etree.parse(clicked_file)
+                # sources are decoded together
+                # after the groups are loaded
+                source_files = []
                 for record in xml.xpath('//group'):
                     #<region x="500" y="300" x2="600" y2="400" width="100" height="100" source="20d5fba1ae631fe3358ea57571be781dc971a7420597b55f15cffa46c79fea2d"/>
                     name = str(record.xpath("./@name")[0])
@@ -402,9 +718,9 @@ class ClickableFileChooserListView(FileChooserListView):
                         x2 = int(region.xpath("./@x2")[0])
                         y2 = int(region.xpath("./@y2")[0])
                         source = region.xpath("./@source")[0]
-                        img = self.app.file_binary(os.path.join(clicked_file_path, "{}.jpg".format(source)))
-                        self.app.thumbs_info.add_thumb(img)
-                        self.app.thumbnails.add_widget(img, index=len(self.app.thumbnails.children))
+                        source_file = os.path.join(clicked_file_path, "{}.jpg".format(source))
+                        if source_file not in source_files:
+                            source_files.append(source_file)
                         # load rectangle selections
                         group = Group()
                         group.name = name
@@ -419,6 +735,7 @@ class ClickableFileChooserListView(FileChooserListView):
                         if group not in self.app.groups:
                             self.app.groups.append(group)
                         self.app.working_image.draw_groups()
+                FileLoader(self.app, source_files).start()
         except IndexError as ex:
             print(ex)
             pass
@@ -427,50 +744,795 @@ class GlworbLabel(RecycleDataViewBehavior, ButtonBehavior, Label):
     def __init__(self, **kwargs):
         super(GlworbLabel, self).__init__(**kwargs)
 
+    def refresh_view_attrs(self, rv, index, data):
+        # rows start with a summary, ask for the
+        # fields once the row is in view
+        if not data.get('loaded'):
+            rv.request_fields(data['glworb'])
+        return super(GlworbLabel, self).refresh_view_attrs(rv, index, data)
+
     def on_press(self):
         self.parent.parent.app.add_glworb(self.glworb)
 
+def glworb_batches(match="glworb:*", count=1000):
+    """Scan for glworbs in batches of roughly count keys,
+    yielding a list of (glworb, fields) for each batch.
+
+    Each batch is fetched with a single pipelined HGETALL
+    so a batch costs one round trip instead of one per key.
+    """
+    cursor = 0
+    seen = set()
+    while True:
+        cursor, glworbs = redis_conn.scan(cursor=cursor, match=match, count=count)
+        # scan may return a key more than once
+        glworbs = [glworb for glworb in glworbs if glworb not in seen]
+        seen.update(glworbs)
+        if glworbs:
+            pipe = redis_conn.pipeline(transaction=False)
+            for glworb in glworbs:
+                pipe.hgetall(glworb)
+            yield list(zip(glworbs, pipe.execute()))
+        if cursor == 0:
+            break
+
+class GlworbWriteBuffer(object):
+    """Coalesces glworb field edits made in quick succession
+    and writes them with one MULTI/EXEC pipeline.
+
+    Edits are applied to the index straight away, so the ui
+    reads its own writes without waiting for the flush, and
+    are laid over fields read back from redis until flushed.
+    If the server cannot be reached the edits are kept and
+    the flush is retried.
+    """
+    def __init__(self, index, delay=0.3, retry_delay=5):
+        self.index = index
+        # glworb : {field : value}, None deletes the field
+        self.pending = collections.OrderedDict()
+        self.flush_trigger = Clock.create_trigger(self.flush, delay)
+        self.retry_delay = retry_delay
+        self.retry_trigger = Clock.create_trigger(self.flush, retry_delay)
+
+    def set_field(self, glworb, field, value):
+        self.edit(glworb, {field : value})
+
+    def delete_field(self, glworb, field):
+        self.edit(glworb, {field : None})
+
+    def rename_field(self, glworb, prior_field, field, value):
+        edits = {field : value}
+        if prior_field != field:
+            edits[prior_field] = None
+        self.edit(glworb, edits)
+
+    def edit(self, glworb, edits):
+        try:
+            self.pending[glworb].update(edits)
+        except KeyError:
+            self.pending[glworb] = dict(edits)
+        self.flush_trigger()
+        fields = self.overlay(glworb, self.index.fields(glworb))
+        if fields:
+            self.index.update(glworb, fields)
+            self.index.notify([glworb], [])
+        elif self.index.remove(glworb):
+            self.index.notify([], [glworb])
+
+    def overlay(self, glworb, fields):
+        """Return fields with pending edits of glworb applied"""
+        edits = self.pending.get(glworb)
+        if not edits:
+            return fields
+        fields = dict(fields)
+        for field, value in edits.items():
+            if value is None:
+                fields.pop(field, None)
+            else:
+                fields[field] = value
+        return fields
+
+    def flush(self, *args):
+        if not self.pending:
+            return
+        pipe = redis_conn.pipeline(transaction=True)
+        for glworb, edits in self.pending.items():
+            mapping = {field : value for field, value in edits.items() if value is not None}
+            deleted = [field for field, value in edits.items() if value is None]
+            if mapping:
+                pipe.hset(glworb, mapping=mapping)
+            if deleted:
+                pipe.hdel(glworb, *deleted)
+        # edits are kept until written
+        try:
+            pipe.execute()
+        except redis.exceptions.ResponseError as ex:
+            # rejected by the server, retrying would fail
+            # again, drop the edits and show what is stored
+            logger.warning("could not write glworb edits: %s", ex)
+            pending = self.pending
+            self.pending = collections.OrderedDict()
+            try:
+                self.index.refresh(list(pending))
+            except redis.exceptions.RedisError as ex:
+                logger.warning("could not read back glworbs: %s", ex)
+            return
+        except redis.exceptions.RedisError as ex:
+            logger.warning("could not write glworb edits, retrying in %s seconds: %s", self.retry_delay, ex)
+            self.retry_trigger()
+            return
+        self.pending = collections.OrderedDict()
+
+class GlworbIndex(object):
+    """In-process copy of all glworbs, loaded once in
+    batches and then kept current through redis keyspace
+    notifications.
+
+    The server's notify-keyspace-events setting is only
+    changed if configure_notifications is set. If
+    notifications are not enabled, or the subscription
+    stops, the keyspace is rescanned every rescan_interval
+    seconds instead. After the pubsub connection reconnects
+    the keyspace is rescanned once, since events may have
+    been lost.
+
+    Field values are held once, by the field index, and
+    glworbs keeps the keys in load order.
+
+    Callbacks registered with bind are called on the kivy
+    thread as callback(changed, removed) with lists of
+    glworb keys.
+    """
+    def __init__(self, match="glworb:*", batch_size=1000, rescan_interval=30):
+        self.match = match
+        self.batch_size = batch_size
+        self.rescan_interval = rescan_interval
+        self.configure_notifications = False
+        # whether keyspace notifications are received
+        self.notifications = False
+        self.subscribed = False
+        self.watch_event = None
+        self.rescanner = None
+        self.rescan_event = None
+        self.rescan_seen = set()
+        self.rescan_after_load = False
+        # glworb : None, an ordered set
+        self.glworbs = {}
+        # the same keys in a list for random sampling,
+        # removal swaps the last key into the gap
+        self.sample_keys = []
+        self.sample_positions = {}
+        self.text_index = TextIndex()
+        self.field_index = FieldIndex()
+        self.loaded = False
+        self.loader = None
+        self.loader_event = None
+        self.listeners = []
+        self.pubsub = None
+        self.pubsub_thread = None
+        # keys touched by notifications, fetched
+        # on the kivy thread by flush
+        self.dirty = set()
+        self.dirty_lock = threading.Lock()
+        self.flush_scheduled = False
+        self.writes = GlworbWriteBuffer(self)
+
+    def bind(self, callback):
+        self.listeners.append(callback)
+
+    def unbind(self, callback):
+        try:
+            self.listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def notify(self, changed, removed):
+        if changed or removed:
+            for callback in self.listeners:
+                callback(changed, removed)
+
+    def update(self, glworb, fields):
+        # keep the search indexes in step before
+        # listeners query them
+        if glworb not in self.glworbs:
+            self.sample_positions[glworb] = len(self.sample_keys)
+            self.sample_keys.append(glworb)
+        self.glworbs[glworb] = None
+        self.field_index.add(glworb, fields)
+        self.text_index.add(glworb, self.document(glworb, fields))
+
+    def remove(self, glworb):
+        if glworb in self.glworbs:
+            del self.glworbs[glworb]
+            position = self.sample_positions.pop(glworb)
+            last = self.sample_keys.pop()
+            if last != glworb:
+                self.sample_keys[position] = last
+                self.sample_positions[last] = position
+            self.text_index.remove(glworb)
+            self.field_index.remove(glworb)
+            return True
+        return False
+
+    def document(self, glworb, fields=None):
+        if fields is None:
+            fields = self.fields(glworb)
+        return str(data_models.pretty_format(fields, glworb))
+
+    def search(self, query):
+        """Return glworbs matching query (see search.Query)
+        or None if the query is empty"""
+        return query.search(self.text_index, self.field_index)
+
+    def sort(self, glworbs, field):
+        return self.field_index.sort(glworbs, field)
+
+    def start(self):
+        # subscribe before loading so that changes made
+        # while loading are not missed
+        self.subscribe()
+        self.loader = glworb_batches(match=self.match, count=self.batch_size)
+        self.loader_event = Clock.schedule_interval(self.load_batch, 0)
+        self.watch_event = Clock.schedule_interval(self.watch, self.rescan_interval)
+
+    def stop(self):
+        self.writes.flush()
+        for event in (self.loader_event, self.watch_event, self.rescan_event):
+            if event is not None:
+                event.cancel()
+        self.unsubscribe()
+
+    def load_batch(self, dt):
+        try:
+            batch = next(self.loader)
+        except StopIteration:
+            self.loaded = True
+            self.loader_event = None
+            if self.rescan_after_load:
+                self.start_rescan()
+            return False
+
+        changed = []
+        for glworb, fields in batch:
+            fields = self.writes.overlay(glworb, fields)
+            if fields:
+                self.update(glworb, fields)
+                changed.append(glworb)
+        self.notify(changed, [])
+
+    def notifications_enabled(self):
+        """Return True if the server sends the keyspace
+        events the index needs, enabling them first if
+        configure_notifications is set"""
+        try:
+            # K keyspace events for h hash commands, g generic
+            # commands such as del and x expired keys, 'A' is
+            # an alias that includes h, g and x
+            flags = redis_conn.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+        except redis.exceptions.RedisError as ex:
+            # CONFIG may be disabled on the server
+            logger.warning("could not read notify-keyspace-events: %s", ex)
+            return False
+        missing = [flag for flag in "Khgx" if flag not in flags and not (flag != "K" and "A" in flags)]
+        if not missing:
+            return True
+        if not self.configure_notifications:
+            logger.warning("keyspace notifications are not enabled (notify-keyspace-events is %r, "
+                           "needs Khgx), rescanning glworbs every %s seconds", flags, self.rescan_interval)
+            return False
+        try:
+            redis_conn.config_set('notify-keyspace-events', flags + "".join(missing))
+            logger.info("set notify-keyspace-events to %r", flags + "".join(missing))
+            return True
+        except redis.exceptions.RedisError as ex:
+            logger.warning("could not enable keyspace notifications, rescanning glworbs every %s seconds: %s",
+                           self.rescan_interval, ex)
+            return False
+
+    def subscribe(self):
+        self.unsubscribe()
+        self.notifications = self.notifications_enabled()
+        if not self.notifications:
+            return
+
+        db = redis_conn.connection_pool.connection_kwargs.get('db', 0)
+        self.subscribed = False
+        self.pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+        # on_connect resubscribes when the pubsub connection
+        # reconnects, wrap it to resync the index as well
+        resubscribe = self.pubsub.on_connect
+        def on_connect(connection):
+            resubscribe(connection)
+            self.pubsub_connected()
+        self.pubsub.on_connect = on_connect
+        try:
+            self.pubsub.psubscribe(**{"__keyspace@{}__:{}".format(db, self.match) : self.keyspace_event})
+            self.subscribed = True
+            self.pubsub_thread = self.pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+        except redis.exceptions.RedisError as ex:
+            logger.warning("could not subscribe to keyspace notifications: %s", ex)
+            self.notifications = False
+            self.unsubscribe()
+
+    def unsubscribe(self):
+        if self.pubsub_thread is not None:
+            self.pubsub_thread.stop()
+            self.pubsub_thread = None
+        if self.pubsub is not None:
+            try:
+                self.pubsub.close()
+            except redis.exceptions.RedisError:
+                pass
+            self.pubsub = None
+
+    def pubsub_connected(self):
+        # called on whichever thread connected, connecting
+        # within psubscribe is the initial subscribe
+        if not self.subscribed:
+            return
+        logger.warning("keyspace notifications reconnected, rescanning glworbs")
+        Clock.schedule_once(self.start_rescan)
+
+    def watch(self, dt):
+        if self.pubsub_thread is not None and not self.pubsub_thread.is_alive():
+            logger.warning("keyspace notifications stopped, resubscribing")
+            self.subscribe()
+            self.start_rescan()
+        elif not self.notifications:
+            self.start_rescan()
+
+    def start_rescan(self, *args):
+        """Rescan the keyspace in batches, one per frame,
+        and update what changed since it was loaded"""
+        if not self.loaded:
+            self.rescan_after_load = True
+            return
+        if self.rescanner is not None:
+            return
+        self.rescan_after_load = False
+        self.rescanner = glworb_batches(match=self.match, count=self.batch_size)
+        self.rescan_seen = set()
+        self.rescan_event = Clock.schedule_interval(self.rescan_batch, 0)
+
+    def end_rescan(self):
+        self.rescanner = None
+        self.rescan_event = None
+        self.rescan_seen = set()
+
+    def rescan_batch(self, dt):
+        try:
+            batch = next(self.rescanner)
+        except StopIteration:
+            # keys created during the scan may not have been
+            # returned, check unseen ones before removing
+            unseen = [glworb for glworb in self.glworbs if glworb not in self.rescan_seen]
+            self.end_rescan()
+            try:
+                self.refresh(unseen)
+            except redis.exceptions.RedisError as ex:
+                logger.warning("glworb rescan failed: %s", ex)
+            return False
+        except redis.exceptions.RedisError as ex:
+            logger.warning("glworb rescan failed: %s", ex)
+            self.end_rescan()
+            return False
+
+        changed = []
+        for glworb, fields in batch:
+            fields = self.writes.overlay(glworb, fields)
+            if not fields:
+                continue
+            self.rescan_seen.add(glworb)
+            if glworb not in self.glworbs or self.field_index.fields(glworb) != fields:
+                self.update(glworb, fields)
+                changed.append(glworb)
+        self.notify(changed, [])
+
+    def keyspace_event(self, message):
+        # called from the pubsub thread, channel is
+        # __keyspace@<db>__:<key>
+        glworb = message['channel'].split(":", 1)[1]
+        with self.dirty_lock:
+            self.dirty.add(glworb)
+            if self.flush_scheduled:
+                return
+            self.flush_scheduled = True
+        Clock.schedule_once(self.flush)
+
+    def flush(self, dt):
+        with self.dirty_lock:
+            glworbs = self.dirty
+            self.dirty = set()
+            self.flush_scheduled = False
+        self.refresh(glworbs)
+
+    def refresh(self, glworbs):
+        """Fetch glworbs with one pipelined HGETALL and
+        notify listeners of what changed"""
+        glworbs = list(glworbs)
+        if not glworbs:
+            return
+        pipe = redis_conn.pipeline(transaction=False)
+        for glworb in glworbs:
+            pipe.hgetall(glworb)
+
+        changed = []
+        removed = []
+        for glworb, fields in zip(glworbs, pipe.execute()):
+            # keep edits that are not flushed yet
+            fields = self.writes.overlay(glworb, fields)
+            if fields:
+                self.update(glworb, fields)
+                changed.append(glworb)
+            elif self.remove(glworb):
+                removed.append(glworb)
+        self.notify(changed, removed)
+
+    def fields(self, glworb):
+        if glworb in self.glworbs:
+            return self.field_index.fields(glworb)
+        # not loaded yet
+        return redis_conn.hgetall(glworb)
+
+    def fetch(self, glworbs):
+        """Return {glworb : fields}, glworbs that are not
+        loaded yet are read with one pipelined HGETALL"""
+        fetched = {}
+        missing = []
+        for glworb in glworbs:
+            if glworb in self.glworbs:
+                fetched[glworb] = self.field_index.fields(glworb)
+            else:
+                missing.append(glworb)
+        if missing:
+            pipe = redis_conn.pipeline(transaction=False)
+            for glworb in missing:
+                pipe.hgetall(glworb)
+            fetched.update(zip(missing, pipe.execute()))
+        return fetched
+
+    def field_count(self, glworb):
+        return self.field_index.field_count(glworb)
+
+    def random_glworb(self):
+        return self.sample(1)[0]
+
+    def sample(self, n, attempts=3):
+        """Return up to n distinct random glworbs.
+
+        Once loaded the index is sampled directly. Before
+        that, RANDOMKEY is pipelined and keys that are not
+        glworbs are dropped, falling back to a single SCAN
+        batch if the keyspace holds few glworbs.
+        """
+        if self.loaded or len(self.sample_keys) >= n:
+            return random.sample(self.sample_keys, min(n, len(self.sample_keys)))
+
+        prefix = self.match.rstrip("*")
+        sampled = []
+        for _ in range(attempts):
+            pipe = redis_conn.pipeline(transaction=False)
+            for _ in range(2 * (n - len(sampled))):
+                pipe.randomkey()
+            for key in pipe.execute():
+                if key is None:
+                    # empty db
+                    return sampled
+                if key.startswith(prefix) and key not in sampled:
+                    sampled.append(key)
+                    if len(sampled) == n:
+                        return sampled
+
+        _, keys = redis_conn.scan(cursor=0, match=self.match, count=self.batch_size)
+        keys = [key for key in set(keys) if key not in sampled]
+        sampled.extend(random.sample(keys, min(n - len(sampled), len(keys))))
+        return sampled
+
+glworb_index = GlworbIndex()
+
+class GlworbFieldCache(object):
+    """Bounded LRU of glworbs whose rows show their fields.
+    Fields are kept only for glworbs that are not in the
+    index yet, the index already holds the others"""
+    def __init__(self, size=200):
+        self.size = size
+        self.entries = collections.OrderedDict()
+
+    def __contains__(self, glworb):
+        return glworb in self.entries
+
+    def get(self, glworb):
+        try:
+            self.entries.move_to_end(glworb)
+            return self.entries[glworb]
+        except KeyError:
+            return None
+
+    def put(self, glworb, fields=None):
+        """Add glworb and return the glworbs evicted to make room"""
+        self.entries[glworb] = fields
+        self.entries.move_to_end(glworb)
+        evicted = []
+        while len(self.entries) > self.size:
+            evicted.append(self.entries.popitem(last=False)[0])
+        return evicted
+
+    def discard(self, glworb):
+        self.entries.pop(glworb, None)
+
+    def clear(self):
+        self.entries.clear()
+
 class GlworbRecycleView(RecycleView):
+    """Glworb list that holds a key and a one line summary
+    per row. Fields are fetched for the rows scrolled into
+    view and kept in a bounded cache, rows whose fields are
+    evicted go back to their summary. Changes patch, append
+    or delete rows of data in place."""
     def __init__(self, **kwargs):
         self.viewclass = 'GlworbLabel'
-
+        self.query = Query("")
+        # glworb : position in self.data
+        self.positions = {}
+        self.field_cache = GlworbFieldCache(size=200)
+        self.requested = set()
+        self.fetch_trigger = Clock.create_trigger(self.fetch_fields)
         super(GlworbRecycleView, self).__init__(**kwargs)
+        glworb_index.bind(self.glworbs_changed)
         self.populate()
 
-    def populate(self):
-        self.data = []
-        for glworb in redis_conn.scan_iter(match="glworb:*"):
-            self.data.append({'text': str(data_models.pretty_format(redis_conn.hgetall(glworb), glworb)), 'glworb' : glworb, 'fields' : redis_conn.hgetall(glworb)})
+    def summary_row(self, glworb):
+        return {'text': "{} ({} fields)".format(glworb, glworb_index.field_count(glworb)),
+                'glworb' : glworb,
+                'loaded' : False}
+
+    def set_row(self, glworb, row):
+        self.data[self.positions[glworb]] = row
+
+    def populate(self, filter_text=None):
+        self.query = Query(filter_text or "")
+        self.field_cache.clear()
+        matches = glworb_index.search(self.query)
+        if matches is None:
+            glworbs = list(glworb_index.glworbs)
+        else:
+            # keep load order for matches
+            glworbs = [glworb for glworb in glworb_index.glworbs if glworb in matches]
+        self.data = [self.summary_row(glworb) for glworb in glworbs]
+        self.positions = {glworb : i for i, glworb in enumerate(glworbs)}
+
+    def glworbs_changed(self, changed, removed):
+        deleted = []
+        added = []
+        for glworb in removed:
+            self.field_cache.discard(glworb)
+            if glworb in self.positions and glworb not in glworb_index.glworbs:
+                deleted.append(self.positions[glworb])
+        for glworb in changed:
+            self.field_cache.discard(glworb)
+            if glworb not in glworb_index.glworbs:
+                continue
+            if self.query:
+                fields = glworb_index.fields(glworb)
+                if not self.query.matches(fields, glworb_index.document(glworb, fields)):
+                    if glworb in self.positions:
+                        deleted.append(self.positions[glworb])
+                    continue
+            if glworb in self.positions:
+                self.set_row(glworb, self.summary_row(glworb))
+            else:
+                added.append(glworb)
+
+        if added:
+            # new glworbs are appended, as loaded
+            added = list(collections.OrderedDict.fromkeys(added))
+            for i, glworb in enumerate(added, len(self.data)):
+                self.positions[glworb] = i
+            self.data.extend([self.summary_row(glworb) for glworb in added])
+        if deleted:
+            deleted = sorted(set(deleted))
+            for i in reversed(deleted):
+                del self.positions[self.data[i]['glworb']]
+                del self.data[i]
+            # only rows after the first deleted one moved
+            for i in range(deleted[0], len(self.data)):
+                self.positions[self.data[i]['glworb']] = i
+
+    def request_fields(self, glworb):
+        self.requested.add(glworb)
+        self.fetch_trigger()
+
+    def fetch_fields(self, dt):
+        glworbs = [glworb for glworb in self.requested if glworb in self.positions]
+        self.requested = set()
+        # glworbs in the index are read from it, only
+        # others are fetched and cached
+        missing = [glworb for glworb in glworbs
+                   if glworb not in glworb_index.glworbs and self.field_cache.get(glworb) is None]
+        fetched = glworb_index.fetch(missing)
+        for glworb in glworbs:
+            if glworb in glworb_index.glworbs:
+                fields = glworb_index.fields(glworb)
+                cached = None
+            else:
+                fields = fetched.get(glworb)
+                if fields is None:
+                    fields = self.field_cache.get(glworb)
+                cached = fields
+            for evicted in self.field_cache.put(glworb, cached):
+                if evicted in self.positions:
+                    self.set_row(evicted, self.summary_row(evicted))
+            self.set_row(glworb, {'text': str(data_models.pretty_format(fields, glworb)),
+                                  'glworb' : glworb,
+                                  'loaded' : True})
 
     def filter_view(self, filter_text):
         if filter_text:
-            self.data = []
-            for glworb in redis_conn.scan_iter(match="glworb:*"):
-                glworb_text = str(data_models.pretty_format(redis_conn.hgetall(glworb), glworb))
-                if filter_text in glworb_text:
-                    self.data.append({'text': glworb_text, 'glworb' : glworb, 'fields' : redis_conn.hgetall(glworb)})
+            self.populate(filter_text=filter_text)
         else:
             self.populate()
 
-    def mass_add(self, sort_by=None):
-        if sort_by is None:
-            sorted_glworbs = sorted(self.data)
+    def mass_add(self, sort_by=None, progress=None):
+        glworbs = [row['glworb'] for row in self.data]
+        if sort_by:
+            # glworbs without the field are added last
+            sorted_glworbs = glworb_index.sort(glworbs, sort_by)
         else:
-            sorted_glworbs = sorted(self.data, key=lambda x: (x['fields'][sort_by]))
+            sorted_glworbs = sorted(glworbs)
+
+        self.cancel_mass_add()
+        self.loader = GlworbLoader(self.app, sorted_glworbs, progress=progress)
+        self.loader.start()
 
-        for glworb in sorted_glworbs:
-            self.app.add_glworb(glworb['glworb'])
+    def cancel_mass_add(self):
+        try:
+            self.loader.cancel()
+        except AttributeError:
+            pass
 
 class ScatterTextWidget(BoxLayout):
 
     def __init__(self, **kwargs):
         super(ScatterTextWidget, self).__init__(**kwargs)
-        self.image_grid.bind(minimum_height=self.image_grid.setter('height'),
-                             minimum_width=self.image_grid.setter('width'))
 
     def on_touch_up(self, touch):
         return super(ScatterTextWidget, self).on_touch_up(touch)
 
+class ThumbnailStrip(Widget):
+    """Horizontal strip of thumbnails, thumbs holds all of
+    them from left to right but only those in or near the
+    scroll view's viewport are added as children"""
+    thumb_width = NumericProperty(250)
+    thumb_height = NumericProperty(250)
+    zoom = NumericProperty(1)
+
+    def __init__(self, **kwargs):
+        self.thumbs = []
+        # thumbnails shown beyond each side of the viewport
+        self.margin = 2
+        self.highlighted = None
+        # thumbnail size at zoom 1
+        self.base_width = 250
+        self.base_height = 250
+        self.min_zoom = 1 / 8
+        self.max_zoom = 8
+        # wheel ticks within a frame are applied together
+        self.pending_zoom = 1
+        # sizes thumbnail textures can be resized to
+        self.levels = []
+        super(ThumbnailStrip, self).__init__(**kwargs)
+        self.layout_trigger = Clock.create_trigger(self.layout_thumbs)
+        self.zoom_trigger = Clock.create_trigger(self.apply_zoom)
+        self.bind(pos=self.layout_trigger)
+
+    def on_parent(self, widget, parent):
+        if parent is not None:
+            parent.bind(scroll_x=self.layout_trigger, width=self.layout_trigger)
+
+    def add_thumb(self, thumb, index=None):
+        if index is None:
+            self.thumbs.append(thumb)
+        else:
+            self.thumbs.insert(index, thumb)
+        self.resize_strip()
+
+    def set_highlighted(self, thumb):
+        if self.highlighted is not None and self.highlighted is not thumb:
+            self.highlighted.unhighlight()
+        self.highlighted = thumb
+
+    def remove_thumb(self, thumb):
+        if thumb is self.highlighted:
+            self.highlighted = None
+        self.thumbs.remove(thumb)
+        if thumb.parent is self:
+            self.remove_widget(thumb)
+        self.resize_strip()
+
+    def resize_strip(self, *args):
+        self.width = len(self.thumbs) * self.thumb_width
+        self.height = self.thumb_height
+        self.layout_trigger()
+
+    def set_base_size(self, width, height):
+        self.base_width = width
+        self.base_height = height
+        self.thumb_width = width * self.zoom
+        self.thumb_height = height * self.zoom
+        self.resize_strip()
+
+    def zoom_by(self, factor):
+        self.pending_zoom *= factor
+        self.zoom_trigger()
+
+    def apply_zoom(self, *args):
+        zoom = min(max(self.zoom * self.pending_zoom, self.min_zoom), self.max_zoom)
+        self.pending_zoom = 1
+        if zoom == self.zoom:
+            return
+        scroller = self.parent
+        # keep the thumbnail at the center of the viewport
+        # in place
+        center = None
+        if scroller is not None:
+            left = scroller.scroll_x * max(self.width - scroller.width, 0)
+            center = (left + scroller.width / 2) / self.thumb_width
+
+        self.zoom = zoom
+        self.thumb_width = self.base_width * zoom
+        self.thumb_height = self.base_height * zoom
+        self.resize_strip()
+
+        if center is not None:
+            scrollable = self.width - scroller.width
+            if scrollable > 0:
+                left = center * self.thumb_width - scroller.width / 2
+                scroller.scroll_x = min(max(left / scrollable, 0), 1)
+
+    def level(self):
+        """Return the smallest level at least as large as
+        the thumbnails are shown, or the largest level"""
+        size = max(self.thumb_width, self.thumb_height)
+        for level in sorted(self.levels):
+            if level >= size:
+                return level
+        return max(self.levels) if self.levels else None
+
+    def visible_range(self, margin=0):
+        """Return the first and last index of the thumbs
+        within margin thumbnails of the viewport"""
+        scroller = self.parent
+        if scroller is None or not self.thumbs:
+            return 0, -1
+        left = scroller.scroll_x * max(self.width - scroller.width, 0)
+        first = int(left // self.thumb_width) - margin
+        last = int((left + scroller.width) // self.thumb_width) + margin
+        return max(first, 0), min(last, len(self.thumbs) - 1)
+
+    def layout_thumbs(self, *args):
+        first, last = self.visible_range(self.margin)
+        shown = self.thumbs[first:last + 1]
+        shown_set = set(shown)
+        for child in list(self.children):
+            if child not in shown_set:
+                self.remove_widget(child)
+        for i, thumb in enumerate(shown, first):
+            if thumb.parent is not self:
+                self.add_widget(thumb)
+            thumb.size = (self.thumb_width, self.thumb_height)
+            thumb.pos = (self.x + i * self.thumb_width, self.y)
+            if thumb.highlight_color is not None:
+                thumb.draw_highlight()
+
+    def scroll_to(self, thumb):
+        """Center the scroll view on thumb"""
+        scroller = self.parent
+        scrollable = self.width - scroller.width
+        if scrollable > 0:
+            center = (self.thumbs.index(thumb) + 0.5) * self.thumb_width
+            scroller.scroll_x = min(max((center - scroller.width / 2) / scrollable, 0), 1)
+        self.layout_trigger()
+
 class ScrollViewer(ScrollView):
     def __init__(self, **kwargs):
         super(ScrollViewer, self).__init__(**kwargs)
@@ -478,29 +1540,25 @@ class ScrollViewer(ScrollView):
     def handle_keybinds(self, keycode, modifiers):
         if keycode[1] == 'left' and not modifiers:
             try:
-                self.scroll_x -= (1/len(self.parent.image_grid.children))
+                self.scroll_x -= (1/len(self.parent.image_grid.thumbs))
                 if self.scroll_x < 0:
                     self.scroll_x = 0
-            except TypeError as ex:
+            except (TypeError, ZeroDivisionError) as ex:
                 pass
         elif keycode[1] == 'right' and not modifiers:
             try:
-                self.scroll_x += (1/len(self.parent.image_grid.children))
+                self.scroll_x += (1/len(self.parent.image_grid.thumbs))
                 if self.scroll_x > 1:
                     self.scroll_x = 1
-            except TypeError as ex:
+            except (TypeError, ZeroDivisionError) as ex:
                 pass
 
     def enlarge(self, zoom_amount=2):
-        for child in self.parent.image_grid.children:
-            child.width *= zoom_amount
-            child.height *= zoom_amount
+        # thumbnails share one zoom, set on the strip
+        self.parent.image_grid.zoom_by(zoom_amount)
 
     def shrink(self, zoom_amount=2):
-        for child in self.parent.image_grid.children:
-            print(child.size)
-            child.width /= zoom_amount
-            child.height /= zoom_amount
+        self.parent.image_grid.zoom_by(1 / zoom_amount)
 
     def on_touch_down(self, touch):
         #self.dispatch('on_test_event', touch)  # Some event that happens with on_touch_down
@@ -532,63 +1590,118 @@ class GlworbInfo(BoxLayout):
         self.app = app
         self.current_uuid = None
         self.env_binary_key = None
+        # field : row, rows hold field_widget and value_widget
+        self.rows = {}
+        self.row_height_multiplier = 35
         self.scroll_container = ScrollView(bar_width=20, size_hint_y=1)
         self.glworb_container = BoxLayout(orientation='vertical', size_hint_y=None, height=800, minimum_height=200)
         super(GlworbInfo, self).__init__(**kwargs)
         self.scroll_container.add_widget(self.glworb_container)
         self.add_widget(self.scroll_container)
 
+        # footer widgets are created once and kept below the rows
+        new_field_name = TextInput(text="", multiline=False, size_hint_y=1, height=44)
+        new_field_value = TextInput(text="", multiline=False, size_hint_y=1, height=44)
+        new_field_name.bind(on_text_validate=lambda widget: self.add_field(widget, new_field_value))
+        new_field_value.bind(on_text_validate=lambda widget: self.add_field(new_field_name, widget))
+        add_row = BoxLayout(orientation='horizontal', size_hint_y=None)
+        add_row.add_widget(new_field_name)
+        add_row.add_widget(new_field_value)
+        self.pipe_env_label = Label(text="", size_hint_y=None, height=44)
+        self.footer = [Label(text="add field:value", halign="left", size_hint_y=None, size_hint_x=None, height=44),
+                       add_row,
+                       self.pipe_env_label]
+        glworb_index.bind(self.glworbs_changed)
+
+    def glworbs_changed(self, changed, removed):
+        if self.current_uuid in changed or self.current_uuid in removed:
+            self.update_current()
+
     def update_current(self):
         if self.current_uuid:
             self.update(self.current_uuid)
 
     def update(self, uuid):
-        self.current_uuid = uuid
         container = self.glworb_container
-        container.clear_widgets()
-        fields = redis_conn.hgetall(uuid)
+        fields = glworb_index.fields(uuid)
+        category_colors = {category.category.name : category.category.color for category in self.app.categories}
+
+        if uuid != self.current_uuid or not container.children:
+            # different glworb, rebuild all rows
+            self.current_uuid = uuid
+            container.clear_widgets()
+            self.rows = {}
+            for k, v in sorted(fields.items()):
+                row = self.field_row(k, v, category_colors)
+                self.rows[k] = row
+                container.add_widget(row)
+            for widget in self.footer:
+                container.add_widget(widget)
+        else:
+            # same glworb, patch changed rows
+            for k in set(self.rows) - set(fields):
+                container.remove_widget(self.rows.pop(k))
+            for k, v in fields.items():
+                try:
+                    row = self.rows[k]
+                except KeyError:
+                    self.insert_row(k, self.field_row(k, v, category_colors))
+                    continue
+                value_widget = row.value_widget
+                # do not overwrite a value being edited
+                if value_widget.text != v and not value_widget.focus:
+                    value_widget.text = v
+                # categories may have been added or recolored
+                value_widget.background_color = self.value_color(value_widget.text, category_colors)
+
+        self.highlight_key()
+        self.pipe_env_label.text = "pipe env -> {}".format(str(self.app.pipe_env))
+        self.glworb_container.height = len(container.children) * self.row_height_multiplier
+
+    def field_row(self, k, v, category_colors):
         # use row_defaults for field : value widgets
         row_defaults = { 'font_size' : 15, 'size_hint_y' : 1, 'height' : 30 }
-        row_height_multiplier = 35
-        for k, v in sorted(fields.items()):
-            row = BoxLayout(orientation='horizontal')
-            field = GlworbInfoCell(container=self, text=k, multiline=False, **row_defaults)
-            # use prior_field to delete correct field
-            # even if field text has changed
-            field.prior_field = field.text
-            row.add_widget(field)
-            # select the binary field to be passed in the env dictionary
-            # for the pipes
-            #field.bind(on_press=lambda widget:  self.set_key(widget))
-            # remove field:value if field set to ''
-            field.bind(on_text_validate=lambda widget: self.update_field(widget))
-
-            if field.text == self.env_binary_key:
-                field.background_color = (0, 0, 1, 1)
-            if v in [category.category.name for category in self.app.categories]:
-                category = [category.category for category in self.app.categories if v == category.category.name][0]
-                field_value = TextInput(text=v, background_color=(*category.color.rgb,1), multiline=False, **row_defaults)
-                row.add_widget(field_value)
-                field_value.field = field
-                field_value.bind(on_text_validate=lambda widget: self.update_field_value(widget.field.text, widget.text))
-            else:
-                field_value = TextInput(text=v, multiline=False, **row_defaults)
-                row.add_widget(field_value)
-                field_value.field = field
-                field_value.bind(on_text_validate=lambda widget: self.update_field_value(widget.field.text, widget.text))
-            container.add_widget(row)
-        container.add_widget(Label(text="add field:value", halign="left", size_hint_y=None, size_hint_x=None, height=44))
-        new_field_name = TextInput(text="", multiline=False, size_hint_y=1, height=44)
-        new_field_value = TextInput(text="", multiline=False, size_hint_y=1, height=44)
-        new_field_name.bind(on_text_validate=lambda widget: self.add_field(widget, new_field_value))
-        new_field_value.bind(on_text_validate=lambda widget: self.add_field(new_field_name, widget))
-        add_row = BoxLayout(orientation='horizontal', size_hint_y=None)
+        row = BoxLayout(orientation='horizontal')
+        field = GlworbInfoCell(container=self, text=k, multiline=False, **row_defaults)
+        # use prior_field to delete correct field
+        # even if field text has changed
+        field.prior_field = field.text
+        row.add_widget(field)
+        # remove field:value if field set to ''
+        field.bind(on_text_validate=lambda widget: self.update_field(widget))
+
+        field_value = TextInput(text=v, background_color=self.value_color(v, category_colors), multiline=False, **row_defaults)
+        row.add_widget(field_value)
+        field_value.field = field
+        field_value.bind(on_text_validate=lambda widget: self.update_field_value(widget.field.text, widget.text))
+        row.field_widget = field
+        row.value_widget = field_value
+        return row
+
+    def insert_row(self, k, row):
+        # kivy indexes children from the bottom,
+        # rows are sorted by field above the footer
+        container = self.glworb_container
+        fields = sorted(self.rows)
+        below = len(fields) - bisect.bisect_left(fields, k)
+        container.add_widget(row, index=len(self.footer) + below)
+        self.rows[k] = row
 
-        add_row.add_widget(new_field_name)
-        add_row.add_widget(new_field_value)
-        container.add_widget(add_row)
-        container.add_widget(Label(text="pipe env -> {}".format(str(self.app.pipe_env)), size_hint_y=None, height=44))
-        self.glworb_container.height = len(container.children) * row_height_multiplier
+    @staticmethod
+    def value_color(value, category_colors):
+        try:
+            return (*category_colors[value].rgb, 1)
+        except KeyError:
+            return (1, 1, 1, 1)
+
+    def highlight_key(self):
+        # select the binary field to be passed in the env dictionary
+        # for the pipes
+        for k, row in self.rows.items():
+            if k == self.env_binary_key:
+                row.field_widget.background_color = (0, 0, 1, 1)
+            else:
+                row.field_widget.background_color = (1, 1, 1, 1)
 
     def add_field(self, name_widget, value_widget):
         if name_widget.text == "":
@@ -600,7 +1713,6 @@ class GlworbInfo(BoxLayout):
             self.update_field_value(name_widget.text,value_widget.text)
             name_widget.text = ""
             value_widget.text = ""
-            self.update(self.current_uuid)
 
     def update_field(self, widget):
         field = widget.text
@@ -608,37 +1720,32 @@ class GlworbInfo(BoxLayout):
         if field == "":
             print("removing field {}".format(widget.prior_field))
             # remove field if emptied
-            redis_conn.hdel(self.current_uuid, *[widget.prior_field])
-            self.update(self.current_uuid)
+            glworb_index.writes.delete_field(self.current_uuid, prior_field)
         else:
-            value=''
-            for row in self.glworb_container.children:
-                for w in row.children:
-                    try:
-                        if w.field == widget:
-                            value = w.text
-                            break
-                    except Exception as ex:
-                        print(ex)
+            value = ''
+            try:
+                value = self.rows[prior_field].value_widget.text
+            except KeyError as ex:
+                logger.warning("no value for field: %s", ex)
             print("value is {}".format(value))
-            redis_conn.hset(self.current_uuid, {field : value})
-            self.update(self.current_uuid)
+            glworb_index.writes.rename_field(self.current_uuid, prior_field, field, value)
 
     def update_field_value(self, field, value):
-        # add_field will also overwrite existing field
+        # writes are buffered and shown through
+        # the index before they are flushed,
+        # this will also overwrite existing field
         print(field, [self.current_uuid], [value])
-        data_models.add_field(field, [self.current_uuid], values=[value])
-        self.update(self.current_uuid)
+        glworb_index.writes.set_field(self.current_uuid, field, value)
 
     def add_field_value(self, field, value):
-        data_models.add_field(field, [self.current_uuid], values=[value])
-        self.update(self.current_uuid)
+        glworb_index.writes.set_field(self.current_uuid, field, value)
 
     def set_key(self, widget):
         self.env_binary_key = widget.text
         widget.background_color = (0, 0, 1, 1)
         self.app.pipe_env['key'] = widget.text
-        self.update(self.current_uuid)
+        self.highlight_key()
+        self.pipe_env_label.text = "pipe env -> {}".format(str(self.app.pipe_env))
 
 class RuleGenerator(BoxLayout):
     def __init__(self, app, **kwargs):
@@ -778,7 +1885,7 @@ class RuleGenerator(BoxLayout):
         # run all thumbnail images through pipe
         # multiple regions = multiple ocr_rectangles
         # single pipe or multiple pipes?
-        for thumb in self.app.thumbnails.children:
+        for thumb in self.app.thumbnails.thumbs:
             # if source_path is None:
             # save to bytesio and add as glworb
             if thumb.source_path:
@@ -1033,7 +2140,7 @@ class OutputPreview(BoxLayout):
             elif output_type == "xml+sources(dir)":
                 machine_root.write(os.path.join(output_path, xml_filename), pretty_print=True)
                 for h in used_source_hashes:
-                    export_source(self.app.thumbnails.children, h, path=output_path)
+                    export_source(self.app.thumbnails.thumbs, h, path=output_path)
             elif output_type == "xml+sources(zipped)":
                 # create a temp directory for material to zip
                 zip_path = "/tmp/generated"
@@ -1041,7 +2148,7 @@ class OutputPreview(BoxLayout):
                     os.mkdir(zip_path)
                 machine_root.write(os.path.join(zip_path, xml_filename), pretty_print=True)
                 for h in used_source_hashes:
-                    export_source(self.app.thumbnails.children, h, path=zip_path)
+                    export_source(self.app.thumbnails.thumbs, h, path=zip_path)
 
                 #.zip extension will be appended by function
                 shutil.make_archive(os.path.join(output_path, 'generated'), 'zip', zip_path)
@@ -1054,7 +2161,15 @@ def export_source(images, source_hash, path=None):
         try:
             if source_hash == img.source_hash:
                 file = os.path.join(path, '{}.jpg'.format(source_hash))
-                img.texture.save(file,flipped=False)
+                # export the full size source, thumbnails
+                # only hold a small level
+                contents = img.app.source_contents(img)
+                if contents:
+                    with open(file, "wb") as f:
+                        f.write(contents)
+                else:
+                    img.texture.save(file,flipped=False)
+                break
         except Exception as ex:
             print(ex)
             pass
@@ -1420,6 +2535,11 @@ class CategoryContainer(BoxLayout):
 
         self.app.update_project_image()
         self.app.update_project_thumbnail()
+        # recolor field values matching categories
+        try:
+            self.app.glworb_info.update_current()
+        except AttributeError:
+            pass
 
     def add_category(self, category):
         if category.rough_order is None:
@@ -1634,6 +2754,7 @@ class GroupContainer(BoxLayout):
         g = GroupItem(height=50, size_hint_y=None)
         g.group = group
         g.update_group_display()
+        self.app.group_index.add(group)
         self.add_widget(g)
         # set scroll location to created group
         self.parent.scroll_to(g)
@@ -1644,6 +2765,7 @@ class GroupContainer(BoxLayout):
             try:
                 if group.group.name == name:
                     self.app.groups.remove(group.group)
+                    self.app.group_index.remove(group.group)
                     self.app.removed_groups.append(name)
                     del group.group
                     self.remove_widget(group)
@@ -1700,39 +2822,51 @@ class ClickableImage(Image):
         self.col_spacing = 100
         self.offset_x = 0
         self.offset_y = 0
-        self.geometry = []
+        self.geometry = collections.OrderedDict()
+        self.grid_mesh = None
         self.app = None
         self.resized = False
         self.source_hash = source_hash
         self.source_path = source_path
+        # file the image was read from, if any
+        self.source_file = None
+        # size the image was resized to
+        self.level = None
         self.hidden = False
         self.hidden_hash = None
         self.selection_mode = False
         self.selection_mode_selections = []
         self.selection_mode_group = None
+        self.highlight_color = None
         super(ClickableImage, self).__init__(**kwargs)
 
     def unhighlight(self):
         highlight_group = "highlight"
+        self.highlight_color = None
         with self.canvas:
             self.canvas.remove_group(highlight_group)
 
     def highlight(self, highlight_color=None):
-        highlight_group = "highlight"
-        for child in self.parent.children:
-            try:
-                child.unhighlight()
-            except AttributeError as ex:
-                pass
+        # only one thumbnail in the strip is highlighted
+        try:
+            self.app.thumbnails.set_highlighted(self)
+        except AttributeError as ex:
+            pass
         if highlight_color is None:
             highlight_color = [0, 1, 0, 1]
+        self.highlight_color = highlight_color
+        self.draw_highlight()
 
+    def draw_highlight(self):
+        # redrawn by the strip when the thumbnail moves
+        highlight_group = "highlight"
         with self.canvas:
             self.canvas.remove_group(highlight_group)
-            w, h = self.size
-            x, y = self.pos
-            Color(*highlight_color)
-            Line(rectangle=(x, y, w, h), width=3, group=highlight_group)
+            if self.highlight_color is not None:
+                w, h = self.size
+                x, y = self.pos
+                Color(*self.highlight_color)
+                Line(rectangle=(x, y, w, h), width=3, group=highlight_group)
 
     def resize_window(self, *args):
         # only resize once...
@@ -1744,7 +2878,7 @@ class ClickableImage(Image):
             self.resized = True
 
     def redraw(self):
-        self.geometry = []
+        self.geometry = collections.OrderedDict()
         self.clear_grid()
         self.draw_groups()
         self.draw_grid()
@@ -1759,15 +2893,6 @@ class ClickableImage(Image):
         self.canvas.remove_group('selections')
         self.canvas.remove_group('clicks')
 
-    @lru_cache(maxsize=32)
-    def hidden_texture(self, width, height):
-        texture = Texture.create(size=self.texture_size, colorfmt="rgb")
-        size = self.texture_size[0] * self.texture_size[1] * 3
-        buf = ([bytes(int(x * 255 / size) for x in range(size))])
-        buf = b''.join(buf)
-        texture.blit_buffer(buf, colorfmt='rgb', bufferfmt='ubyte')
-        return texture
-
     def hide(self):
         # clicking a thumb may have changed image texture
         # if has changed, reset hidden status so that toggling
@@ -1776,13 +2901,13 @@ class ClickableImage(Image):
             self.hidden = False
         self.hidden = not self.hidden
         if self.hidden:
-            self.texture = self.hidden_texture(*self.norm_image_size)
+            self.texture = hidden_texture(*self.texture_size)
             self.hidden_hash = self.source_hash
         else:
             # retrieve texture from thumbs
-            for thumb in self.app.thumbnails.children:
+            for thumb in self.app.thumbnails.thumbs:
                 if thumb.source_hash == self.source_hash:
-                    self.texture = thumb.texture
+                    self.texture = self.app.level_texture(thumb, self.app.resize_size)
                     try:
                         self.source_path = thumb.source_path
                     except AttributeError:
@@ -1837,25 +2962,32 @@ class ClickableImage(Image):
 
         w = int(w)
         h = int(h)
-        self.canvas.remove_group('grid')
-
-        with self.canvas:
-            Color(128, 128, 128, 0.5)
 
-            if self.cols is not None:
-                for col in range(0, w, self.col_spacing):
-                    # for line 0 coordinate is bottom of screen?
-                    # h (ie entire height) is top...
-                    Line(points=[col + self.offset_x, 0 + self.offset_y, col + self.offset_x, h + self.offset_y], width=1, group='grid')
-                    # debug from 0,0
-                    # Line(points=[0, 0, col + self.offset_x, h + self.offset_y], width=1, group='grid')
-
-            if self.rows is not None:
-                for row in range(0, h, self.row_spacing):
-                    #Line(points=[0 + self.offset_x, row, w + self.offset_x, row], width=1, group='grid')
-                    # debug from 0,0
-                    Line(points=[0 + self.offset_x, row + self.offset_y, w + self.offset_x, row + self.offset_y], width=1, group='grid')
-                    # Line(points=[0, 0, w + self.offset_x, row], width=1, group='grid')
+        # one mesh of line segments, x, y, u, v per
+        # vertex, created once and updated in place
+        vertices = []
+        if self.cols is not None:
+            for col in range(0, w, self.col_spacing):
+                # for line 0 coordinate is bottom of screen?
+                # h (ie entire height) is top...
+                vertices.extend([col + self.offset_x, 0 + self.offset_y, 0, 0,
+                                 col + self.offset_x, h + self.offset_y, 0, 0])
+
+        if self.rows is not None:
+            for row in range(0, h, self.row_spacing):
+                vertices.extend([0 + self.offset_x, row + self.offset_y, 0, 0,
+                                 w + self.offset_x, row + self.offset_y, 0, 0])
+        indices = list(range(len(vertices) // 4))
+
+        if self.grid_mesh is None:
+            # drawn after the canvas so the grid
+            # stays above groups and selections
+            with self.canvas.after:
+                Color(128, 128, 128, 0.5)
+                self.grid_mesh = Mesh(vertices=vertices, indices=indices, mode='lines')
+        else:
+            self.grid_mesh.vertices = vertices
+            self.grid_mesh.indices = indices
 
     def draw_geometry(self):
         self.clear_grid()
@@ -1879,7 +3011,29 @@ class ClickableImage(Image):
             texture_size = list(texture.size)
             Rectangle(pos=(x,y), texture=texture, size=texture_size, group="clicks")
 
+    def grid_cell(self, x, y, w, h):
+        """Return the lower left corner of the grid cell
+        strictly containing x, y or None if x, y is on a
+        grid line or outside the w by h grid"""
+        if self.col_spacing <= 0 or self.row_spacing <= 0:
+            return None
+        col = self.offset_x + int((x - self.offset_x) // self.col_spacing) * self.col_spacing
+        row = self.offset_y + int((y - self.offset_y) // self.row_spacing) * self.row_spacing
+        if not (0 <= col - self.offset_x < w and 0 <= row - self.offset_y < h):
+            return None
+        if col < x < col + self.col_spacing and row < y < row + self.row_spacing:
+            return col, row
+        return None
+
     def draw_grid_click(self, x, y):
+        self.draw_grid_clicks([(x, y)])
+
+    def draw_grid_clicks(self, points):
+        """Toggle the grid cells under points as one
+        selection, the cells are added to or removed from a
+        single group and groups are redrawn once"""
+        if not points:
+            return
         # w, h = self.texture_size
         w,h = self.norm_image_size
         w = int(w)
@@ -1890,17 +3044,16 @@ class ClickableImage(Image):
         #       [X]
         #    [X][X][X]
         #       [X]
-        for g in self.app.groups:
-            if g.bounding_contains_point(x, y):
-                group = g
-            elif g.bounding_contains_point(x + self.col_spacing, y):
-                group = g
-            elif g.bounding_contains_point(x - self.col_spacing, y):
-                group = g
-            elif g.bounding_contains_point(x, y + self.row_spacing):
-                group = g
-            elif g.bounding_contains_point(x, y - self.row_spacing):
-                group = g
+        group_index = self.app.group_index
+        group_index.resize(self.col_spacing, self.row_spacing)
+        neighbors = []
+        for x, y in points:
+            neighbors.extend([(x, y),
+                              (x + self.col_spacing, y),
+                              (x - self.col_spacing, y),
+                              (x, y + self.row_spacing),
+                              (x, y - self.row_spacing)])
+        group = group_index.group_at(neighbors)
 
         if group is None:
             group = Group()
@@ -1921,33 +3074,42 @@ class ClickableImage(Image):
 
         Color(128, 128, 128, 0.5)
         dotsize = 10
+        # each cell is toggled once even if
+        # several points fall in it
+        cells = collections.OrderedDict()
         with self.canvas:
-            Ellipse(pos=(x - (dotsize / 2), y - (dotsize / 2)), size=(dotsize, dotsize), group='clicks')
-        # 0,0 is lower left corner
-        for col in range(0 + self.offset_x, w + self.offset_x, self.col_spacing):
-            for row in range(0 + self.offset_y, h + self.offset_y, self.row_spacing):
-                if col < x and x < col + self.col_spacing:
-                    if row < y and y < row + self.row_spacing:
-                        rect = (col, row, self.col_spacing, self.row_spacing)
-                        rect_points = (col, row, col + self.col_spacing, row + self.row_spacing)
-                        if rect not in self.geometry:
-                            with self.canvas:
-                                Rectangle(pos=(col,row), size=(self.col_spacing, self.row_spacing), group="selections")
-                            self.geometry.append(rect)
-                            #x,y,w,h
-                            if not rect_points in group.regions:
-                                group.regions.append(rect_points)
-                        else:
-                            self.geometry.remove(rect)
-                            try:
-                                group.regions.remove(rect_points)
-                            except ValueError as ex:
-                                print(ex)
-                                pass
-                            self.draw_geometry()
+            for x, y in points:
+                Ellipse(pos=(x - (dotsize / 2), y - (dotsize / 2)), size=(dotsize, dotsize), group='clicks')
+                # 0,0 is lower left corner
+                cell = self.grid_cell(x, y, w, h)
+                if cell is not None:
+                    cells[cell] = None
+
+        removed = False
+        for col, row in cells:
+            rect = (col, row, self.col_spacing, self.row_spacing)
+            rect_points = (col, row, col + self.col_spacing, row + self.row_spacing)
+            if rect not in self.geometry:
+                with self.canvas:
+                    Rectangle(pos=(col,row), size=(self.col_spacing, self.row_spacing), group="selections")
+                self.geometry[rect] = None
+                #x,y,w,h
+                if not rect_points in group.regions:
+                    group.regions.append(rect_points)
+            else:
+                del self.geometry[rect]
+                try:
+                    group.regions.remove(rect_points)
+                except ValueError as ex:
+                    logger.warning("region not in group: %s", ex)
+                    pass
+                removed = True
+        if removed:
+            self.draw_geometry()
         if group not in self.app.groups:
             self.app.groups.append(group)
 
+        group_index.update(group)
         self.group_container.update_group(group.name)
         self.draw_groups()
 
@@ -1960,37 +3122,21 @@ class ClickableImage(Image):
         y2 = int(round(y2))
 
         if axis == "x":
-            if x > x2:
-                start = x2
-                end = x
-            else:
-                start = x
-                end = x2
-            for c in range(start, end, self.col_spacing):
-                offset = 0
-                self.draw_grid_click(c + offset, y)
+            start, end = sorted((x, x2))
+            self.draw_grid_clicks([(c, y) for c in range(start, end, self.col_spacing)])
 
         if axis == "y":
-            if y > y2:
-                start = y2
-                end = y
-            else:
-                start = y
-                end = y2
-            for c in range(start, end, self.row_spacing):
-                offset = 0
-                self.draw_grid_click(x, c + offset)
+            start, end = sorted((y, y2))
+            self.draw_grid_clicks([(x, c) for c in range(start, end, self.row_spacing)])
 
     def draw_grid_click_line(self, x, y, axis, end_x=None, end_y=None):
         w, h = self.texture_size
 
         if axis == "x":
-            for c in range(0, w, self.row_spacing):
-                self.draw_grid_click(c + 2, y)
+            self.draw_grid_clicks([(c + 2, y) for c in range(0, w, self.row_spacing)])
 
         if axis == "y":
-            for c in range(0, h, self.col_spacing):
-                self.draw_grid_click(x, c + 2)
+            self.draw_grid_clicks([(x, c + 2) for c in range(0, h, self.col_spacing)])
 
     def handle_keybinds(self, keycode, modifiers):
         # this will cause problems typing
@@ -2001,7 +3147,7 @@ class ClickableImage(Image):
         # spacebar must be pressed twice on
         # start
         if keycode[1] == "spacebar":
-            self.geometry = []
+            self.geometry = collections.OrderedDict()
             self.clear_grid()
             self.draw_groups()
         elif keycode[1] == "down" and 'ctrl' in modifiers:
@@ -2041,6 +3187,7 @@ class ClickableImage(Image):
                             # have enough points to draw rectangle
                             # set group region(s) and reset/leave selection_mode
                             self.selection_mode_group.group.regions = [self.selection_mode_selections[:4]]
+                            self.app.group_index.update(self.selection_mode_group.group)
                             self.selection_mode_group.update_group_display()
                             self.selection_mode = False
                             self.selection_mode_group = None
@@ -2075,9 +3222,10 @@ class ClickableImage(Image):
                         #kivy.uix.widget.WidgetException
                         pass
 
-                    self.app.overlay_image.texture = self.texture
-                    self.app.overlay_image.size = self.texture_size
-                    self.app.overlay_container.size = self.texture_size
+                    texture = self.app.level_texture(self, self.app.resize_size)
+                    self.app.overlay_image.texture = texture
+                    self.app.overlay_image.size = texture.size
+                    self.app.overlay_container.size = texture.size
                     print(self.app.overlay_container.size , self.app.overlay_image.size, self.app.overlay_image.norm_image_size)
 
                     self.app.overlay_image.draw_groups()
@@ -2086,29 +3234,455 @@ class ClickableImage(Image):
                     
         return super().on_touch_up(touch)
 
-def bimg_resized(uuid, new_size, linking_uuid=None):
-    contents = binary_r.get(uuid)
-    f = io.BytesIO()
-    f = io.BytesIO(contents)
-    img = PImage.open(f)
-    original_size = img.size
-    img.thumbnail((new_size, new_size), PImage.ANTIALIAS)
-    extension = img.format
-    if linking_uuid:
-        data_model_string = data_models.pretty_format(redis_conn.hgetall(linking_uuid), linking_uuid)
-        # escape braces
-        data_model_string = data_model_string.replace("{","{{")
-        data_model_string = data_model_string.replace("}","}}")
-        #img = data_models.img_overlay(img, data_model_string, 50, 50, 12)
-    file = io.BytesIO()
-    img.save(file, extension)
-    img.close()
-    file.seek(0)
-
-    filehash = hashlib.new('sha256')
-    filehash.update(f.getvalue())
-
-    return file, filehash, original_size
+def pixels_texture(pixels):
+    # pixels are uploaded as they are, without encoding
+    # to a file for CoreImage to decode again
+    buffer, size, colorfmt = pixels
+    texture = Texture.create(size=size, colorfmt=colorfmt)
+    texture.blit_buffer(buffer, colorfmt=colorfmt, bufferfmt='ubyte')
+    # PIL rows start at the top, texture rows at the bottom
+    texture.flip_vertical()
+    return texture
+
+@lru_cache(maxsize=8)
+def hidden_texture(width, height):
+    """Texture shown in place of hidden images, shared
+    by all images of the same size"""
+    texture = Texture.create(size=(width, height), colorfmt="rgb")
+    size = width * height * 3
+    # a ramp from 0 to 255 over the whole buffer, built as
+    # runs of each value rather than byte by byte
+    starts = [-(-value * size // 255) for value in range(256)] + [size]
+    buf = b''.join(bytes([value]) * (starts[value + 1] - starts[value]) for value in range(256))
+    texture.blit_buffer(buf, colorfmt='rgb', bufferfmt='ubyte')
+    return texture
+
+def visualization_texture(visualization):
+    """Texture from a visualizations result, using its PIL
+    image when there is one instead of decoding its file"""
+    img = visualization[0]
+    if not isinstance(img, PImage.Image):
+        img = PImage.open(visualization[1])
+    return pixels_texture(image_pixels(img))
+
+class BinaryResolver(object):
+    """Reads glworb binaries for many glworbs at once.
+
+    A glworb points to its binary through one of several
+    fields, in order of priority. All of them are read with
+    a single HMGET per glworb, pipelined, and the first one
+    set is used. Binaries are then fetched with one
+    pipelined GET per pointer.
+    """
+    def __init__(self, fields=("binary_key", "binary", "image_binary_key")):
+        self.fields = list(fields)
+
+    def pointers(self, glworbs):
+        """Return {glworb : binary pointer or None}"""
+        pipe = redis_conn.pipeline(transaction=False)
+        for glworb in glworbs:
+            pipe.hmget(glworb, self.fields)
+        pointers = {}
+        for glworb, values in zip(glworbs, pipe.execute()):
+            pointers[glworb] = next((value for value in values if value), None)
+        return pointers
+
+    def binaries(self, glworbs, fetch_fields=None):
+        """Return {glworb : (binary contents, fields)}.
+        fields are only fetched for glworbs without a
+        binary, to draw a placeholder, by fetch_fields(glworbs)
+        or a pipelined HGETALL."""
+        glworbs = list(glworbs)
+        pointers = self.pointers(glworbs)
+
+        with_binary = [glworb for glworb in glworbs if pointers[glworb]]
+        pipe = binary_r.pipeline(transaction=False)
+        for glworb in with_binary:
+            pipe.get(pointers[glworb])
+        contents = dict(zip(with_binary, pipe.execute()))
+
+        without_binary = [glworb for glworb in glworbs if not contents.get(glworb)]
+        fields = {}
+        if without_binary:
+            if fetch_fields is not None:
+                fields = fetch_fields(without_binary)
+            else:
+                pipe = redis_conn.pipeline(transaction=False)
+                for glworb in without_binary:
+                    pipe.hgetall(glworb)
+                fields = dict(zip(without_binary, pipe.execute()))
+
+        return {glworb : (contents.get(glworb), fields.get(glworb, {})) for glworb in glworbs}
+
+binary_resolver = BinaryResolver()
+
+class DecodeService(object):
+    """Pool of workers that decode and resize images.
+
+    Workers return pixel buffers, textures are made from
+    them on the kivy thread. By default the workers are
+    threads, pillow releases the gil while decoding and
+    resizing. With processes, worker processes are used
+    where the platform's default start method is fork,
+    spawned or forkserver workers would import the app's
+    entry point and with it kivy and its window. The pool
+    is forked by start, which is called from the kivy
+    thread before any background threads are running.
+    If processes cannot be started a thread pool is used.
+    A process pool broken by a crashed worker is replaced
+    on the next submit.
+    """
+    def __init__(self, workers=None, processes=False):
+        self.workers = workers
+        self.executor = None
+        self.processes = processes
+        self.lock = threading.Lock()
+
+    def create_executor(self):
+        if self.processes and multiprocessing.get_start_method(allow_none=False) == "fork":
+            try:
+                return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                              mp_context=multiprocessing.get_context(),
+                                                              initializer=worker_init)
+            except (OSError, ValueError) as ex:
+                logger.warning("decode processes unavailable, using threads: %s", ex)
+                self.processes = False
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = self.create_executor()
+
+    def submit(self, function, *args):
+        with self.lock:
+            if self.executor is None:
+                self.executor = self.create_executor()
+            try:
+                return self.executor.submit(function, *args)
+            except concurrent.futures.BrokenExecutor as ex:
+                # a worker died, futures already submitted
+                # fail, start a new pool for the rest
+                logger.warning("decode pool broken, restarting: %s", ex)
+                self.executor.shutdown(wait=False)
+                self.executor = self.create_executor()
+                return self.executor.submit(function, *args)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+
+def failed_future(ex):
+    future = concurrent.futures.Future()
+    future.set_exception(ex)
+    return future
+
+decode_service = DecodeService()
+
+class ThumbnailLoader(object):
+    """Add many images as thumbnails without blocking the ui.
+
+    A thread submits sources in batches to the decode
+    service. Finished images are turned into textures and
+    added to the thumbnails in order, a few per frame. An
+    image not finished within timeout seconds of reaching
+    the front is skipped. progress is called as
+    progress(added, total) on the kivy thread.
+
+    Subclasses define submit(batch), returning a future
+    for each source in batch, and image(source, result),
+    returning the thumbnail image for a finished future.
+    """
+    def __init__(self, app, sources, progress=None, display_widget=None, batch_size=16, per_frame=4, timeout=30):
+        self.app = app
+        self.sources = list(sources)
+        self.progress = progress
+        self.display_widget = display_widget
+        self.batch_size = batch_size
+        self.per_frame = per_frame
+        self.size = app.thumbnail_size
+        self.cancelled = threading.Event()
+        # limit batches submitted ahead of the ui
+        self.ahead = threading.Semaphore(2)
+        # position in sources : future
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.added = 0
+        self.add_event = None
+        self.timeout = timeout
+        # seconds the next image has been waited on
+        self.waited = 0
+
+    def start(self):
+        threading.Thread(target=self.fetch, daemon=True).start()
+        self.add_event = Clock.schedule_interval(self.add_finished, 0)
+
+    def cancel(self):
+        self.cancelled.set()
+        # wake the fetch thread if it is waiting
+        self.ahead.release()
+        with self.pending_lock:
+            for future in self.pending.values():
+                future.cancel()
+            self.pending = {}
+        self.stop()
+
+    def stop(self):
+        if self.add_event is not None:
+            self.add_event.cancel()
+            self.add_event = None
+
+    def fetch(self):
+        for start in range(0, len(self.sources), self.batch_size):
+            self.ahead.acquire()
+            if self.cancelled.is_set():
+                return
+            batch = self.sources[start:start + self.batch_size]
+            try:
+                futures = self.submit(batch)
+            except Exception as ex:
+                # fail the batch so the ui moves past it
+                logger.warning("could not submit thumbnails: %s", ex)
+                futures = [failed_future(ex) for _ in batch]
+            with self.pending_lock:
+                if self.cancelled.is_set():
+                    for future in futures:
+                        future.cancel()
+                    return
+                for i, future in enumerate(futures, start):
+                    self.pending[i] = future
+
+    def add_finished(self, dt):
+        for _ in range(self.per_frame):
+            with self.pending_lock:
+                future = self.pending.get(self.added)
+                if future is None:
+                    break
+                timed_out = not future.done()
+                if timed_out:
+                    self.waited += dt
+                    if self.waited < self.timeout:
+                        break
+                    future.cancel()
+                del self.pending[self.added]
+            if not timed_out:
+                try:
+                    img = self.image(self.sources[self.added], future.result())
+                    self.app.add_thumbnail(img, display_widget=self.display_widget)
+                except Exception as ex:
+                    logger.warning("could not add thumbnail: %s", ex)
+            else:
+                logger.warning("skipping thumbnail, not decoded after %s seconds: %s", self.timeout, self.sources[self.added])
+            self.waited = 0
+            self.added += 1
+            if self.added % self.batch_size == 0:
+                self.ahead.release()
+            if self.progress is not None:
+                self.progress(self.added, len(self.sources))
+
+        if self.added >= len(self.sources):
+            self.stop()
+            return False
+
+class GlworbLoader(ThumbnailLoader):
+    """Binaries are read in pipelined batches
+    and decoded by the decode service"""
+    def submit(self, batch):
+        try:
+            binaries = binary_resolver.binaries(batch)
+        except redis.exceptions.RedisError as ex:
+            logger.warning("could not read glworb binaries: %s", ex)
+            binaries = {glworb : (None, {}) for glworb in batch}
+        futures = []
+        for glworb in batch:
+            contents, fields = binaries[glworb]
+            futures.append(decode_service.submit(glworb_resized, glworb, contents, fields, self.size))
+        return futures
+
+    def image(self, glworb, result):
+        pixels, source_hash, source_size = result
+        return self.app.clickable_image(pixels, source_hash, source_size, source_path=glworb, level=self.size)
+
+class FileLoader(ThumbnailLoader):
+    """Files are read by the decode service workers"""
+    def submit(self, batch):
+        return [decode_service.submit(file_resized, filename, self.size) for filename in batch]
+
+    def image(self, filename, result):
+        pixels, source_hash, source_size = result
+        return self.app.clickable_image(pixels, source_hash, source_size, source_file=filename, level=self.size)
+
+class TextureBudget(object):
+    """Keeps the textures of the thumbnail strip within
+    max_bytes.
+
+    Thumbnails within margin viewport widths of the visible
+    part of the strip keep their textures. Over budget, the
+    textures of the thumbnails farthest from view are
+    dropped and are reloaded by the decode service when
+    they come near again, from the thumbnail cache if
+    possible. Thumbnails near view are also reloaded when
+    zooming the strip changes its resolution level.
+    """
+    def __init__(self, app, max_bytes=256 * 1024 * 1024, margin=1):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.margin = margin
+        # image : bytes of its texture
+        self.sizes = {}
+        self.total_bytes = 0
+        # image : level being loaded
+        self.reloading = {}
+        # (image, level) of glworbs to read from redis,
+        # drained in batches by the reader thread
+        self.misses = []
+        self.misses_lock = threading.Lock()
+        self.reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.scroller = None
+        self.strip = None
+        self.update_trigger = Clock.create_trigger(self.update, 0.1)
+
+    def bind(self, scroller, strip):
+        self.scroller = scroller
+        self.strip = strip
+        scroller.bind(scroll_x=self.update_trigger, width=self.update_trigger)
+        strip.bind(width=self.update_trigger, zoom=self.update_trigger)
+
+    @staticmethod
+    def texture_bytes(texture):
+        if texture is None:
+            return 0
+        width, height = texture.size
+        return width * height * len(texture.colorfmt)
+
+    def track(self, img):
+        nbytes = self.texture_bytes(img.texture)
+        self.total_bytes += nbytes - self.sizes.get(img, 0)
+        self.sizes[img] = nbytes
+
+    def remove(self, img):
+        self.total_bytes -= self.sizes.pop(img, 0)
+        self.reloading.pop(img, None)
+
+    def update(self, *args):
+        if self.strip is None:
+            return
+        thumbs = self.strip.thumbs
+        current = set(thumbs)
+        for img in [img for img in self.sizes if img not in current]:
+            self.remove(img)
+        for img in thumbs:
+            if img not in self.sizes:
+                self.track(img)
+
+        margin = self.margin * int(self.scroller.width // self.strip.thumb_width + 1)
+        first, last = self.strip.visible_range(margin)
+        # thumbnails near view are loaded at the level
+        # matching the zoom
+        level = self.strip.level()
+        for img in thumbs[first:last + 1]:
+            wanted = img.level
+            if level and img.level and img.source_hash:
+                wanted = level
+            if img.texture is None or wanted != img.level:
+                self.reload(img, wanted)
+
+        if self.total_bytes > self.max_bytes:
+            # farthest from view first
+            far = list(range(0, first)) + list(range(last + 1, len(thumbs)))
+            far.sort(key=lambda i: first - i if i < first else i - last, reverse=True)
+            for i in far:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                img = thumbs[i]
+                if img.texture is not None and img.level and img.source_hash:
+                    img.texture = None
+                    self.track(img)
+
+    def reload(self, img, level):
+        if self.reloading.get(img) == level:
+            return
+        self.reloading[img] = level
+        self.submit(img, level, cached_resized, img.source_hash, level)
+
+    def submit(self, img, level, function, *args):
+        # called on the kivy thread or the reader thread
+        try:
+            future = decode_service.submit(function, *args)
+        except Exception as ex:
+            logger.warning("could not reload thumbnail: %s", ex)
+            Clock.schedule_once(lambda dt: self.reload_failed(img, level))
+            return
+        self.reload_with(img, level, future)
+
+    def reload_with(self, img, level, future):
+        # results are applied on the kivy thread
+        future.add_done_callback(lambda future: Clock.schedule_once(lambda dt: self.reloaded(img, level, future)))
+
+    def reload_failed(self, img, level):
+        if self.reloading.get(img) == level:
+            del self.reloading[img]
+
+    def reloaded(self, img, level, future):
+        if self.reloading.get(img) != level:
+            # removed or zoomed to another level while loading
+            return
+        try:
+            result = future.result()
+        except Exception as ex:
+            logger.warning("could not reload thumbnail: %s", ex)
+            del self.reloading[img]
+            return
+
+        if result is None:
+            # no longer in the thumbnail cache, decode the source
+            self.read_source(img, level)
+            return
+
+        del self.reloading[img]
+        pixels, _, _ = result
+        img.texture = pixels_texture(pixels)
+        img.level = level
+        self.track(img)
+
+    def read_source(self, img, level):
+        if img.source_file:
+            # the worker reads the file itself
+            self.submit(img, level, file_resized, img.source_file, level)
+        elif img.source_path:
+            # binaries are read on the reader thread,
+            # not the kivy thread
+            with self.misses_lock:
+                self.misses.append((img, level))
+                if len(self.misses) > 1:
+                    # a read is already queued
+                    return
+            self.reader.submit(self.read_glworbs)
+        else:
+            del self.reloading[img]
+
+    def stop(self):
+        with self.misses_lock:
+            self.misses = []
+        self.reader.shutdown(wait=False)
+
+    def read_glworbs(self):
+        with self.misses_lock:
+            misses = self.misses
+            self.misses = []
+        glworbs = list(collections.OrderedDict.fromkeys(img.source_path for img, _ in misses))
+        try:
+            binaries = binary_resolver.binaries(glworbs)
+        except redis.exceptions.RedisError as ex:
+            logger.warning("could not read thumbnail sources: %s", ex)
+            for img, level in misses:
+                Clock.schedule_once(functools.partial(lambda img, level, dt: self.reload_failed(img, level), img, level))
+            return
+        for img, level in misses:
+            contents, fields = binaries[img.source_path]
+            self.submit(img, level, glworb_resized, img.source_path, contents, fields, level)
 
 class TabItem(TabbedPanelItem):
     def __init__(self, root=None, **kwargs):
@@ -2180,13 +3754,27 @@ class FileChooserPopup(Popup):
 class ChecklistApp(App):
     def __init__(self, *args,**kwargs):
         self.title="dss"
+        # working image level, thumbnails use the smaller
+        # thumbnail level and the full size source is read
+        # only for export
         self.resize_size = 1000
+        self.thumbnail_size = 256
+        # levels the thumbnail strip picks from as it zooms
+        self.thumbnail_levels = [64, self.thumbnail_size, self.resize_size]
+        # (source hash, size) : texture
+        self.level_textures = collections.OrderedDict()
+        self.level_textures_size = 4
+        # thumbnail strip textures, in MB
+        texture_budget = kwargs.get("texture_budget") or 256
+        self.texture_budget = TextureBudget(self, max_bytes=texture_budget * 1024 * 1024)
         self.thumbnail_height = 250
         self.thumbnail_width = 250
         self.working_image_height = 400
         self.working_image_width = 400
         self.pipe_env = {"key" : "binary_key", "key_prefix" : "binary:"}
         self.groups = []
+        # groups by position for working image clicks
+        self.group_index = GroupSpatialIndex()
         self.removed_groups = []
         self.project = {}
         self.project["name"] = ""
@@ -2200,12 +3788,12 @@ class ChecklistApp(App):
         self.initial_random_thumbs = 2
         self.restore_session = True
         self.xml_files_to_load = []
-        if kwargs["db_host"] and kwargs["db_port"]:
-            global binary_r
-            global redis_conn
-            db_settings = {"host" :  kwargs["db_host"], "port" : kwargs["db_port"]}
-            binary_r = redis.StrictRedis(**db_settings)
-            redis_conn = redis.StrictRedis(**db_settings, decode_responses=True)
+        glworb_index.configure_notifications = kwargs.get("configure_keyspace_events", False)
+        decode_service.processes = kwargs.get("decode_processes", False)
+        if kwargs.get("db_socket"):
+            connections.configure(unix_socket_path=kwargs["db_socket"])
+        elif kwargs["db_host"] and kwargs["db_port"]:
+            connections.configure(host=kwargs["db_host"], port=kwargs["db_port"])
 
         if 'xml_file' in kwargs:
             if kwargs['xml_file']:
@@ -2225,7 +3813,7 @@ class ChecklistApp(App):
             pass
 
         try:
-            for img in self.thumbnails.children:
+            for img in self.thumbnails.thumbs:
                 if not 'working_thumbs' in self.session:
                     self.session['working_thumbs'] = set()
                 self.session['working_thumbs'].add(img.source_path)
@@ -2248,85 +3836,93 @@ class ChecklistApp(App):
         input_widget.text = str(widget.value)
         self.working_image.draw_grid()
 
-    def file_binary(self, filename):
+    def file_binary(self, filename, size=None):
         data = io.BytesIO()
         with open(filename, "rb") as f:
             data = io.BytesIO(f.read())
-        return self.bytes_binary(data.getvalue())
-
-    def bytes_binary(self, data):
-        # almost same code as bimg_resized
-        new_size = self.resize_size
-        f = io.BytesIO()
-        f = io.BytesIO(data)
-        img = PImage.open(f)
-        original_size = img.size
-        img.thumbnail((new_size, new_size), PImage.ANTIALIAS)
-        extension = img.format
-        file = io.BytesIO()
-        img.save(file, extension)
-        img.close()
-        file.seek(0)
-
-        filehash = hashlib.new('sha256')
-        filehash.update(f.getvalue())
-
-        img = ClickableImage(source_hash=filehash.hexdigest(),
+        return self.bytes_binary(data.getvalue(), source_file=filename, size=size)
+
+    def bytes_binary(self, data, source_file=None, size=None):
+        if size is None:
+            size = self.thumbnail_size
+        pixels, source_hash, original_size = bytes_resized(data, size)
+        return self.clickable_image(pixels, source_hash, original_size, source_file=source_file, level=size)
+
+    def clickable_image(self, pixels, source_hash, source_size, source_path=None, source_file=None, level=None):
+        img = ClickableImage(source_hash=source_hash,
+                             source_path=source_path,
                              allow_stretch=True,
                              keep_ratio=True)
-        img.texture = CoreImage(file, ext="jpg", keep_data=True).texture
-        img.source_width = original_size[0]
-        img.source_height = original_size[1]
+        img.texture = pixels_texture(pixels)
+        img.source_width, img.source_height = source_size
+        img.source_file = source_file
+        img.level = level
         img.app = self
         return img
 
-    def glworb_binary(self, glworb=None):
-        binary_keys = ["binary_key", "binary", "image_binary_key"]
-
+    def glworb_binary(self, glworb=None, size=None):
         if glworb is None:
             try:
-                glworb = random.choice(list(redis_conn.scan_iter(match="glworb:*")))
+                glworb = glworb_index.random_glworb()
             except IndexError:
                 pass
 
-        for bkey in binary_keys:
-            data = redis_conn.hget(glworb, bkey)
-            if data:
-                print("{} has data".format(bkey))
-                break
-
-        filehash = None
+        return self.glworb_images([glworb], size=size)[0]
+
+    def glworb_images(self, glworbs, size=None):
+        if size is None:
+            size = self.thumbnail_size
+        # binaries for all glworbs are read together
+        binaries = binary_resolver.binaries(glworbs, fetch_fields=glworb_index.fetch)
+        images = []
+        for glworb in glworbs:
+            contents, fields = binaries[glworb]
+            pixels, source_hash, source_size = glworb_resized(glworb, contents, fields, size)
+            images.append(self.clickable_image(pixels, source_hash, source_size, source_path=glworb, level=size))
+        return images
+
+    def source_contents(self, img):
+        """Return the full size source bytes of img or None"""
+        if img.source_file:
+            try:
+                with open(img.source_file, "rb") as f:
+                    return f.read()
+            except OSError as ex:
+                logger.warning("could not read source file: %s", ex)
+        if img.source_path:
+            contents, _ = binary_resolver.binaries([img.source_path])[img.source_path]
+            return contents
+        return None
+
+    def level_texture(self, img, size):
+        """Return a texture of img's source resized to size,
+        the few most recently used are kept"""
+        if img.level == size and img.texture is not None:
+            return img.texture
+        key = (img.source_hash, size)
+        try:
+            self.level_textures.move_to_end(key)
+            return self.level_textures[key]
+        except KeyError:
+            pass
 
+        contents = self.source_contents(img)
         try:
-            data, filehash, source_size = bimg_resized(data, self.resize_size, linking_uuid=glworb)
+            if contents:
+                pixels, _, _ = bytes_resized(contents, size)
+            elif img.source_path:
+                pixels, _, _ = placeholder_resized(img.source_path, glworb_index.fields(img.source_path), size)
+            else:
+                return img.texture
         except OSError as ex:
-            print(ex)
-            data = None
-
-        if not data:
-            placeholder = PImage.new('RGB', (self.resize_size, self.resize_size), (155, 155, 155, 1))
-            source_size = (self.resize_size, self.resize_size)
-            data_model_string = data_models.pretty_format(redis_conn.hgetall(glworb), glworb)
-            if not data_model_string:
-                data_model_string = glworb
-            placeholder = data_models.img_overlay(placeholder, data_model_string, 50, 50, 12)
-            file = io.BytesIO()
-            placeholder.save(file, 'JPEG')
-            placeholder.close()
-            file.seek(0)
-            data = file
-
-            filehash = hashlib.new('sha256')
-            filehash.update(file.getvalue())
-
-        img = ClickableImage(source_hash=filehash.hexdigest(),
-                             source_path = glworb,
-                             allow_stretch=True,
-                             keep_ratio=True)
-        img.texture = CoreImage(data, ext="jpg", keep_data=True).texture
-        img.source_width, img.source_height = source_size
-        img.app = self
-        return img
+            logger.warning("could not resize source: %s", ex)
+            return img.texture
+
+        texture = pixels_texture(pixels)
+        self.level_textures[key] = texture
+        while len(self.level_textures) > self.level_textures_size:
+            self.level_textures.popitem(last=False)
+        return texture
 
     def pick_file(self,*args):
         file_picker = FileChooserPopup()
@@ -2334,37 +3930,40 @@ class ChecklistApp(App):
         file_picker.open()
 
     def add_glworb(self, glworb_id, display_widget=None):
+        img = self.glworb_binary(glworb=glworb_id)
+        self.add_thumbnail(img, display_widget=display_widget)
+
+    def add_thumbnail(self, img, display_widget=None):
         if display_widget is None:
             display_widget = self.thumbnails
-        img = self.glworb_binary(glworb=glworb_id)
         self.thumbs_info.add_thumb(img)
-        print(img)
-        display_widget.add_widget(img)
-        img.width = self.thumbnail_width
-        img.height = self.thumbnail_height
-        display_widget.width += img.width
+        display_widget.add_thumb(img)
+        self.texture_budget.update_trigger()
 
     def change_from_thumb(self, thumb):
         self.change_working_image(thumb)
         self.glworb_info.update(thumb.source_path)
-        self.thumbnails.parent.scroll_to(thumb)
+        self.thumbnails.scroll_to(thumb)
 
     def remove_from_thumbs(self, thumb_hash):
+        thumbs = self.thumbnails.thumbs
         new_thumb_position = 0
-        for i, thumb in enumerate(self.thumbnails.children):
+        for i, thumb in enumerate(thumbs):
             if thumb.source_hash == thumb_hash:
-                self.thumbnails.remove_widget(thumb)
-                new_thumb_position = i - 1
+                self.thumbnails.remove_thumb(thumb)
+                # the thumb to the right, or the
+                # first if the last was removed
+                new_thumb_position = i if i < len(thumbs) else 0
                 break
 
         if self.working_image.source_hash == thumb_hash:
             try:
-                self.change_working_image(self.thumbnails.children[new_thumb_position])
+                self.change_working_image(thumbs[new_thumb_position])
             except IndexError:
                 self.working_image.hide()
 
         try:
-            self.glworb_info.update(self.thumbnails.children[new_thumb_position].source_path)
+            self.glworb_info.update(thumbs[new_thumb_position].source_path)
         except IndexError:
             self.glworb_info.update(None)
 
@@ -2391,13 +3990,8 @@ class ChecklistApp(App):
 
             if output:
                 glworbs = [s for s in process_feedback.split("'") if "glworb:" in s]
-                for g in glworbs:
-                    img = self.glworb_binary(glworb=g)
-                    display_widget.add_widget(img)
-                    self.thumbs_info.add_thumb(img)
-                    img.width = self.thumbnail_width
-                    img.height = self.thumbnail_height
-                    display_widget.width += img.width
+                for img in self.glworb_images(glworbs):
+                    self.add_thumbnail(img, display_widget=display_widget)
                 process_feedback = " ".join(glworbs)
         elif add_method == "webcam":
             addr = "/dev/video0"
@@ -2417,12 +4011,8 @@ class ChecklistApp(App):
 
             if contents:
                 process_feedback = tmp_output_filename
-                img = self.bytes_binary(contents)
-                display_widget.add_widget(img)
-                self.thumbs_info.add_thumb(img)
-                img.width = self.thumbnail_width
-                img.height = self.thumbnail_height
-                display_widget.width += img.width
+                img = self.bytes_binary(contents, source_file=tmp_output_filename)
+                self.add_thumbnail(img, display_widget=display_widget)
         elif add_method == "gphoto2":
             try:
                 output = subprocess.check_output(["gphoto2",
@@ -2436,42 +4026,38 @@ class ChecklistApp(App):
 
             if contents:
                 process_feedback = tmp_output_filename
-                img = self.bytes_binary(contents)
-                display_widget.add_widget(img)
-                self.thumbs_info.add_thumb(img)
-                img.width = self.thumbnail_width
-                img.height = self.thumbnail_height
-                display_widget.width += img.width
+                img = self.bytes_binary(contents, source_file=tmp_output_filename)
+                self.add_thumbnail(img, display_widget=display_widget)
 
         output_label.text = str(process_feedback)
 
     def update_project_image(self):
-        overview = visualizations.project_overview(self.project, Window.width, 50, orientation='horizontal', color_key=True)[1]
-        self.project_image.texture = CoreImage(overview, ext="jpg", keep_data=True).texture
+        overview = visualizations.project_overview(self.project, Window.width, 50, orientation='horizontal', color_key=True)
+        self.project_image.texture = visualization_texture(overview)
 
-        dimensions = visualizations.project_dimensions(self.project, 500, 150, scale=5)[1]
-        self.project_dimensions_image.texture = CoreImage(dimensions, ext="jpg", keep_data=True).texture
+        dimensions = visualizations.project_dimensions(self.project, 500, 150, scale=5)
+        self.project_dimensions_image.texture = visualization_texture(dimensions)
         self.project_dimensions_image.size = self.project_dimensions_image.texture_size
 
     def update_project_thumbnail(self):
-        overview_thumbnail = visualizations.project_overview(self.project, int(self.project_image_thumbnail.parent.width), 25, orientation='horizontal', color_key=True)[1]
-        self.project_image_thumbnail.texture = CoreImage(overview_thumbnail, ext="jpg", keep_data=True).texture
+        overview_thumbnail = visualizations.project_overview(self.project, int(self.project_image_thumbnail.parent.width), 25, orientation='horizontal', color_key=True)
+        self.project_image_thumbnail.texture = visualization_texture(overview_thumbnail)
         self.project_image_thumbnail.size = self.project_image_thumbnail.texture_size
 
     def update_project_rules_thumbnail(self):
-        overview_rules_thumbnail = self.rule_gen.rule_container.rules_thumbnail()[1]
+        overview_rules_thumbnail = self.rule_gen.rule_container.rules_thumbnail()
         self.project_rules_image_thumbnail.allow_stretch = True
         self.project_rules_image_thumbnail.keep_ratio = False
-        self.project_rules_image_thumbnail.texture = CoreImage(overview_rules_thumbnail, ext="jpg", keep_data=True).texture
+        self.project_rules_image_thumbnail.texture = visualization_texture(overview_rules_thumbnail)
         self.project_rules_image_thumbnail.size = self.project_rules_image_thumbnail.texture_size
         if self.project_rules_image_thumbnail.parent.height < self.project_rules_image_thumbnail.height:
             self.project_rules_image_thumbnail.parent.height = self.project_rules_image_thumbnail.height
 
     def update_project_groups_thumbnail(self):
-        overview_groups_thumbnail = self.containers['group'].groups_thumbnail()[1]
+        overview_groups_thumbnail = self.containers['group'].groups_thumbnail()
         self.project_groups_image_thumbnail.allow_stretch = True
         self.project_groups_image_thumbnail.keep_ratio = False
-        self.project_groups_image_thumbnail.texture = CoreImage(overview_groups_thumbnail, ext="jpg", keep_data=True).texture
+        self.project_groups_image_thumbnail.texture = visualization_texture(overview_groups_thumbnail)
         self.project_groups_image_thumbnail.size = self.project_groups_image_thumbnail.texture_size
         if self.project_groups_image_thumbnail.parent.height < self.project_groups_image_thumbnail.height:
             self.project_groups_image_thumbnail.parent.height = self.project_groups_image_thumbnail.height
@@ -2490,12 +4076,13 @@ class ChecklistApp(App):
         c.add_widget(new_attribute)
         parent.add_widget(c)
 
-    def recheck_fields(self, dt):
-        self.glworb_info.update_current()
-
     def change_working_image(self, new):
-        self.working_image.texture = new.texture
+        # thumbnails are small, decode the
+        # working size once selected
+        self.working_image.texture = self.level_texture(new, self.resize_size)
+        self.working_image.level = self.resize_size
         self.working_image.source_hash = new.source_hash
+        self.working_image.source_file = new.source_file
         self.working_image.source_width = new.source_width
         self.working_image.source_height = new.source_height
 
@@ -2770,6 +4357,11 @@ class ChecklistApp(App):
         self.containers['rule']= rules_layout
 
         self.load_session()
+        # start decode workers before any threads do
+        decode_service.start()
+        # load glworbs in the background and keep them
+        # current through keyspace notifications
+        glworb_index.start()
         root = TabbedPanel(do_default_tab=False)
         root.tab_width = 200
         root.app = self
@@ -2778,6 +4370,9 @@ class ChecklistApp(App):
         # use for recycleview item actions when calling
         # add_glworb
         self.thumbnails = thumbnail_container.image_grid
+        self.thumbnails.levels = self.thumbnail_levels
+        self.thumbnails.set_base_size(self.thumbnail_width, self.thumbnail_height)
+        self.texture_budget.bind(thumbnail_container.scroller, thumbnail_container.image_grid)
         self.working_image = None
 
         thumbs_layout = ThumbContainer(self, orientation='vertical', size_hint_y=None, height=800, minimum_height=50)
@@ -2845,12 +4440,15 @@ class ChecklistApp(App):
         groups_scroll = ScrollView(bar_width=20)
         groups_scroll.add_widget(groups_layout)
 
+        # sampled once for the working image and the
+        # initial thumbnails if there is no session
+        random_glworbs = glworb_index.sample(self.initial_random_thumbs + 1)
         try:
             # try to load from session first
             # glworb only, need to check for filesystem too
-            img = self.glworb_binary(glworb=self.session['working_image'])
+            img = self.glworb_binary(glworb=self.session['working_image'], size=self.resize_size)
         except Exception as ex:
-            img = self.glworb_binary()
+            img = self.glworb_binary(glworb=random_glworbs.pop() if random_glworbs else None, size=self.resize_size)
             self.session['working_image'] = img.source_path
             self.session['working_thumbs'].add(img.source_path)
 
@@ -2978,7 +4576,13 @@ class ChecklistApp(App):
         add_filtered.add_widget(Label(text="Load all filtered, sorted by:", size_hint_y=None, height=44))
         add_sort_by = TextInput(multiline=False, size_hint_y=None, height=44)
         add_filtered.add_widget(add_sort_by)
-        add_sort_by.bind(on_text_validate=lambda instance: glworb_view.mass_add(sort_by=instance.text))
+        add_progress = Label(text="", size_hint_y=None, height=44)
+        add_filtered.add_widget(add_progress)
+        add_cancel = Button(text="cancel", size_hint_y=None, size_hint_x=None, height=44)
+        add_cancel.bind(on_press=lambda instance: [glworb_view.cancel_mass_add(), setattr(add_progress, 'text', "cancelled")])
+        add_filtered.add_widget(add_cancel)
+        add_sort_by.bind(on_text_validate=lambda instance: glworb_view.mass_add(sort_by=instance.text,
+                                                                               progress=lambda added, total: setattr(add_progress, 'text', "{}/{}".format(added, total))))
         glworbs_container.add_widget(add_filtered)
         glworbs_container.add_widget(glworb_view)
         sub_tab.add_widget(glworbs_container)
@@ -3023,7 +4627,6 @@ class ChecklistApp(App):
         tab.keybindings.append(img)
         root.add_widget(tab)
 
-        widgets_to_add = []
         # add working image to thumbnails
         # initial_working_image = self.glworb_binary(glworb=self.working_image.source_path)
         # self.thumbs_info.add_thumb(initial_working_image)
@@ -3034,40 +4637,21 @@ class ChecklistApp(App):
         #               )
 
         try:
-            for thumb in self.session['working_thumbs']:
-                print("loading thumb: {}".format(thumb))
-                img = self.glworb_binary(glworb=thumb)
-                self.thumbs_info.add_thumb(img)
-                widgets_to_add.append(functools.partial(
-                                        thumbnail_container.image_grid.add_widget,
-                                        img,
-                                        index=len(thumbnail_container.image_grid.children))
-                                      )
+            working_thumbs = [thumb for thumb in self.session['working_thumbs'] if thumb]
+            logger.info("loading thumbs: %s", working_thumbs)
+            # decoded by the decode service and
+            # added once built
+            GlworbLoader(self, working_thumbs).start()
         except Exception as ex:
             # add a few random thumbnails
-            for _ in range(self.initial_random_thumbs):
-                img = self.glworb_binary()
-                self.thumbs_info.add_thumb(img)
-                widgets_to_add.append(functools.partial(
-                                        thumbnail_container.image_grid.add_widget,
-                                        img,
-                                        index=len(thumbnail_container.image_grid.children))
-                                      )
-
-        for widget in widgets_to_add:
-            widget()
+            for img in self.glworb_images(random_glworbs[:self.initial_random_thumbs]):
+                self.add_thumbnail(img)
 
         lower_container.add_widget(thumbnail_container)
         tab.keybindings.append(thumbnail_container.scroller)
 
-        for c in thumbnail_container.image_grid.children:
-            print(c.size, c.width, c.height)
-            c.width = self.thumbnail_width
-            c.height = self.thumbnail_height
-            thumbnail_container.image_grid.width += c.width
-            if c.height > thumbnail_container.height:
-                thumbnail_container.image_grid.height = c.height
-                lower_container.height = c.height
+        if self.thumbnail_height > thumbnail_container.height:
+            lower_container.height = self.thumbnail_height
 
         tab = TabItem(text="output",root=root)
         generated_xml = OutputPreview(self, size_hint=(1,1))
@@ -3096,7 +4680,6 @@ class ChecklistApp(App):
         # loaded categories if any
         self.containers['category'].update()
 
-        Clock.schedule_interval(self.recheck_fields, 30)
         # draw initial grid on working image
         # using a clock since immediately
         # drawing results in wrong dimensions
@@ -3110,12 +4693,21 @@ class ChecklistApp(App):
 
         return root
 
+    def on_stop(self):
+        glworb_index.stop()
+        self.texture_budget.stop()
+        decode_service.shutdown()
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--xml-file", nargs='+', default=[], help="xml file(s) to load on startup (session will not be restored)")
     parser.add_argument("--force-restore", action='store_true', help="restore session even if loading xml")
     parser.add_argument("--db-host",  help="db host ip, requires use of --db-port")
     parser.add_argument("--db-port", type=int, help="db port, requires use of --db-host")
+    parser.add_argument("--db-socket", help="db unix socket path, used instead of --db-host and --db-port")
+    parser.add_argument("--configure-keyspace-events", action='store_true', help="enable the keyspace notifications used to keep glworbs current (sets notify-keyspace-events on the db server), otherwise glworbs are rescanned periodically if they are not enabled")
+    parser.add_argument("--decode-processes", action='store_true', help="decode images in worker processes instead of threads, only where processes are forked")
+    parser.add_argument("--texture-budget", type=int, default=256, help="memory for thumbnail textures in MB, textures far out of view are dropped above this")
     args = parser.parse_args()
     app = ChecklistApp(**vars(args))
     atexit.register(app.save_session)
@@ -0,0 +1,198 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+# Decoding and resizing of source images. Nothing here uses
+# kivy, so these can run in decode worker processes.
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from PIL import Image as PImage
+from ma_cli import data_models
+
+logger = logging.getLogger(__name__)
+
+class ThumbnailCache(object):
+    """Resized images on disk, keyed by the sha256 of the
+    source bytes and the size they were resized to.
+
+    Files are stored as <size>/<sha[:2]>/<sha>-<width>x<height>
+    where width and height are the source's size, so a hit
+    does not need the source. The total size is capped and
+    the least recently used files, by mtime, are removed
+    first. Hits touch the file to keep it.
+    """
+    def __init__(self, path="~/.cache/dss/thumbnails", max_bytes=512 * 1024 * 1024):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        # evict down to this fraction of max_bytes
+        self.low_water = 0.8
+        # counted on first put
+        self.total_bytes = None
+        self.lock = threading.Lock()
+
+    def directory(self, digest, new_size):
+        return os.path.join(self.path, str(new_size), digest[:2])
+
+    def get(self, digest, new_size):
+        """Return (contents, source size) or None"""
+        directory = self.directory(digest, new_size)
+        prefix = digest + "-"
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return None
+        for name in names:
+            if name.startswith(prefix) and not name.endswith(".tmp"):
+                path = os.path.join(directory, name)
+                try:
+                    with open(path, "rb") as f:
+                        contents = f.read()
+                    os.utime(path)
+                    width, height = name[len(prefix):].split("x")
+                    return contents, (int(width), int(height))
+                except (OSError, ValueError) as ex:
+                    logger.warning("could not read cached thumbnail: %s", ex)
+                    return None
+        return None
+
+    def put(self, digest, new_size, contents, source_size):
+        directory = self.directory(digest, new_size)
+        path = os.path.join(directory, "{}-{}x{}".format(digest, *source_size))
+        # write then rename so a partly written file
+        # is never read, put may be called from threads
+        tmp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(contents)
+            os.replace(tmp_path, path)
+        except OSError as ex:
+            logger.warning("could not write cached thumbnail: %s", ex)
+            return
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(size for _, size, _ in self.entries())
+            else:
+                self.total_bytes += len(contents)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        entries = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total_bytes <= self.max_bytes * self.low_water:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except OSError as ex:
+                logger.warning("could not evict cached thumbnail: %s", ex)
+
+thumbnail_cache = ThumbnailCache()
+
+def image_pixels(img):
+    """Return (raw buffer, size, colorfmt) of a PIL image
+    converted to rgb or rgba, for pixels_texture"""
+    if img.mode not in ("RGB", "RGBA"):
+        if img.mode in ("LA", "PA") or "transparency" in img.info:
+            img = img.convert("RGBA")
+        else:
+            img = img.convert("RGB")
+    return img.tobytes(), img.size, img.mode.lower()
+
+def cached_resized(source_hash, new_size):
+    """Return bytes_resized's result for a source from
+    the thumbnail cache, or None if it is not cached"""
+    cached = thumbnail_cache.get(source_hash, new_size)
+    if cached is None:
+        return None
+    resized, original_size = cached
+    img = PImage.open(io.BytesIO(resized))
+    pixels = image_pixels(img)
+    img.close()
+    return pixels, source_hash, original_size
+
+def bytes_resized(contents, new_size):
+    """Return (pixels, source hash, original size) of
+    contents resized to fit new_size"""
+    source_hash = hashlib.sha256(contents).hexdigest()
+
+    cached = cached_resized(source_hash, new_size)
+    if cached is not None:
+        return cached
+
+    img = PImage.open(io.BytesIO(contents))
+    # groups are scaled to the original size, read it
+    # before thumbnail's draft changes img.size
+    original_size = img.size
+    # thumbnail drafts jpegs to a reduced scale while
+    # decoding, so the full size image is not decoded
+    img.thumbnail((new_size, new_size), PImage.LANCZOS)
+    pixels = image_pixels(img)
+    img.close()
+
+    # only the cached copy is encoded
+    buffer, size, colorfmt = pixels
+    file = io.BytesIO()
+    if colorfmt == "rgba":
+        PImage.frombytes("RGBA", size, buffer).save(file, "PNG")
+    else:
+        PImage.frombytes("RGB", size, buffer).save(file, "JPEG", quality=90)
+    thumbnail_cache.put(source_hash, new_size, file.getvalue(), original_size)
+
+    return pixels, source_hash, original_size
+
+def placeholder_resized(glworb, fields, new_size):
+    # gray image with glworb fields written on it
+    # for glworbs without a binary
+    placeholder = PImage.new('RGB', (new_size, new_size), (155, 155, 155, 1))
+    data_model_string = data_models.pretty_format(fields, glworb)
+    if not data_model_string:
+        data_model_string = glworb
+    placeholder = data_models.img_overlay(placeholder, data_model_string, 50, 50, 12)
+    pixels = image_pixels(placeholder)
+    placeholder.close()
+
+    # hash the text rather than the image so that
+    # every size of a placeholder has the same hash
+    source_hash = hashlib.sha256(data_model_string.encode()).hexdigest()
+
+    return pixels, source_hash, (new_size, new_size)
+
+def glworb_resized(glworb, contents, fields, new_size):
+    if contents:
+        try:
+            return bytes_resized(contents, new_size)
+        except OSError as ex:
+            logger.warning("could not decode glworb %s: %s", glworb, ex)
+    return placeholder_resized(glworb, fields, new_size)
+
+def file_resized(filename, new_size):
+    with open(filename, "rb") as f:
+        contents = f.read()
+    return bytes_resized(contents, new_size)
+
+def worker_init():
+    # workers are forked, a lock held by another
+    # thread at the time would never be released
+    thumbnail_cache.lock = threading.Lock()
@@ -0,0 +1,377 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2018, Galen Curwen-McAdams
+
+import bisect
+import re
+import roman
+
+class TextIndex(object):
+    """Inverted index for case insensitive substring
+    filtering of glworb text.
+
+    Text is split on whitespace into tokens and each token
+    maps to the keys containing it. A second index maps
+    n-grams to the tokens containing them. Query terms are
+    split on whitespace too, so a term is a substring of a
+    text exactly when it is a substring of one of its tokens:
+    a term is looked up by finding matching tokens through
+    their n-grams and taking the union of their keys.
+    Multiple terms are combined with AND.
+
+    Tokens longer than long_token (uuids, hashes) are not
+    split into n-grams, they are few per glworb but mostly
+    unique. They are joined into a single string that is
+    searched with str.find instead.
+    """
+    def __init__(self, gram_size=3, long_token=16):
+        self.gram_size = gram_size
+        self.long_token = long_token
+        # token : set of keys
+        self.postings = {}
+        # gram : set of tokens
+        self.gram_tokens = {}
+        self.long_tokens = set()
+        # joined long tokens and the offset of each,
+        # rebuilt on first search after a change
+        self.long_text = None
+        self.long_list = []
+        self.long_offsets = []
+        # key : set of tokens, used to update or remove a key
+        self.key_tokens = {}
+
+    def __len__(self):
+        return len(self.key_tokens)
+
+    def __contains__(self, key):
+        return key in self.key_tokens
+
+    @staticmethod
+    def terms(text):
+        return text.lower().split()
+
+    def grams(self, token):
+        n = self.gram_size
+        return {token[i:i + n] for i in range(max(len(token) - n + 1, 1))}
+
+    def add(self, key, text):
+        tokens = set(self.terms(text))
+        old_tokens = self.key_tokens.get(key, set())
+        for token in old_tokens - tokens:
+            self.discard_posting(token, key)
+        for token in tokens - old_tokens:
+            try:
+                self.postings[token].add(key)
+            except KeyError:
+                self.postings[token] = {key}
+                if len(token) > self.long_token:
+                    self.long_tokens.add(token)
+                    self.long_text = None
+                    continue
+                for gram in self.grams(token):
+                    try:
+                        self.gram_tokens[gram].add(token)
+                    except KeyError:
+                        self.gram_tokens[gram] = {token}
+        self.key_tokens[key] = tokens
+
+    def remove(self, key):
+        for token in self.key_tokens.pop(key, set()):
+            self.discard_posting(token, key)
+
+    def discard_posting(self, token, key):
+        keys = self.postings[token]
+        keys.discard(key)
+        if not keys:
+            del self.postings[token]
+            if len(token) > self.long_token:
+                self.long_tokens.discard(token)
+                self.long_text = None
+                return
+            for gram in self.grams(token):
+                tokens = self.gram_tokens[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self.gram_tokens[gram]
+
+    def matching_long_tokens(self, term):
+        if self.long_text is None:
+            self.long_list = list(self.long_tokens)
+            self.long_offsets = []
+            offset = 0
+            for token in self.long_list:
+                self.long_offsets.append(offset)
+                offset += len(token) + 1
+            self.long_text = "\n".join(self.long_list)
+
+        tokens = set()
+        start = self.long_text.find(term)
+        while start != -1:
+            i = bisect.bisect_right(self.long_offsets, start) - 1
+            token = self.long_list[i]
+            tokens.add(token)
+            # continue from the next token
+            start = self.long_text.find(term, self.long_offsets[i] + len(token) + 1)
+        return tokens
+
+    def matching_tokens(self, term):
+        tokens = self.matching_long_tokens(term)
+        if len(term) < self.gram_size:
+            # short terms: every gram containing the term
+            for gram, gram_tokens in self.gram_tokens.items():
+                if term in gram:
+                    tokens.update(gram_tokens)
+            return tokens
+
+        candidates = []
+        for gram in self.grams(term):
+            try:
+                candidates.append(self.gram_tokens[gram])
+            except KeyError:
+                return tokens
+        candidates.sort(key=len)
+        tokens.update(token for token in set.intersection(*candidates) if term in token)
+        return tokens
+
+    def search(self, query):
+        """Return the set of keys matching all terms of
+        query or None if query has no terms"""
+        terms = self.terms(query)
+        if not terms:
+            return None
+
+        # longest terms first, they usually match the fewest
+        # keys. Short terms match many tokens, once there are
+        # matches it is cheaper to check the matches' tokens
+        terms.sort(key=len, reverse=True)
+        matches = None
+        for term in terms:
+            if matches is not None and len(term) < self.gram_size:
+                matches = {key for key in matches
+                           if any(term in token for token in self.key_tokens[key])}
+            else:
+                keys = set()
+                for token in self.matching_tokens(term):
+                    keys.update(self.postings[token])
+                if matches is None:
+                    matches = keys
+                else:
+                    matches &= keys
+            if not matches:
+                return set()
+        return matches
+
+def text_matches(query, text):
+    """Linear equivalent of TextIndex.search for a single text"""
+    text = text.lower()
+    return all(term in text for term in TextIndex.terms(query))
+
+def value_key(value):
+    """Sort key for a field value, numbers and roman
+    numerals sort numerically before other text"""
+    try:
+        return (0, int(value))
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+        # nan does not sort
+        if number == number:
+            return (0, number)
+    except ValueError:
+        pass
+    try:
+        # must be uppercase for roman module
+        return (0, roman.fromRoman(value.upper()))
+    except Exception:
+        pass
+    return (1, value.lower())
+
+class FieldIndex(object):
+    """Secondary indexes of glworb field values.
+
+    Each field keeps the values of the keys that have it,
+    and a list of keys ordered by value_key. The ordered
+    list is rebuilt on first use after the field changes.
+    """
+    def __init__(self):
+        # field : {key : value}
+        self.values = {}
+        # field : (sort keys, keys) ordered by sort key
+        self.ordered_values = {}
+        # key : fields in the order they were added
+        self.key_fields = {}
+
+    def add(self, key, fields):
+        for field in set(self.key_fields.get(key, ())) - set(fields):
+            self.discard(field, key)
+        for field, value in fields.items():
+            try:
+                values = self.values[field]
+            except KeyError:
+                values = self.values[field] = {}
+            if values.get(key) != value:
+                values[key] = value
+                self.ordered_values.pop(field, None)
+        # field order is kept for display
+        self.key_fields[key] = tuple(fields)
+
+    def remove(self, key):
+        for field in self.key_fields.pop(key, ()):
+            self.discard(field, key)
+
+    def fields(self, key):
+        return {field : self.values[field][key] for field in self.key_fields.get(key, ())}
+
+    def field_count(self, key):
+        return len(self.key_fields.get(key, ()))
+
+    def discard(self, field, key):
+        values = self.values[field]
+        del values[key]
+        if not values:
+            del self.values[field]
+        self.ordered_values.pop(field, None)
+
+    def ordered(self, field):
+        try:
+            return self.ordered_values[field]
+        except KeyError:
+            pass
+        entries = sorted((value_key(value), key) for key, value in self.values.get(field, {}).items())
+        ordered = ([sort_key for sort_key, _ in entries], [key for _, key in entries])
+        self.ordered_values[field] = ordered
+        return ordered
+
+    def select(self, field, operator, value):
+        """Return the set of keys where field operator value
+        holds, operator is one of has = != < <= > >= ~"""
+        values = self.values.get(field, {})
+        if operator == "has":
+            return set(values)
+        if operator == "~":
+            value = value.lower()
+            return {key for key, field_value in values.items() if value in field_value.lower()}
+        if operator == "!=":
+            return set(values) - self.select(field, "=", value)
+
+        sort_keys, keys = self.ordered(field)
+        query_key = value_key(value)
+        # only compare numbers with numbers and
+        # text with text
+        kind = query_key[0]
+        start = bisect.bisect_left(sort_keys, (kind,))
+        end = bisect.bisect_left(sort_keys, (kind + 1,))
+        if operator == "=":
+            start = bisect.bisect_left(sort_keys, query_key, start, end)
+            end = bisect.bisect_right(sort_keys, query_key, start, end)
+        elif operator == ">=":
+            start = bisect.bisect_left(sort_keys, query_key, start, end)
+        elif operator == ">":
+            start = bisect.bisect_right(sort_keys, query_key, start, end)
+        elif operator == "<=":
+            end = bisect.bisect_right(sort_keys, query_key, start, end)
+        elif operator == "<":
+            end = bisect.bisect_left(sort_keys, query_key, start, end)
+        return set(keys[start:end])
+
+    def sort(self, keys, field):
+        """Return keys ordered by the value of field, keys
+        without the field follow in their given order"""
+        keys = list(keys)
+        wanted = set(keys)
+        _, ordered = self.ordered(field)
+        if len(ordered) > 4 * len(keys):
+            # few keys compared to the field's
+            # index, sort them directly
+            values = self.values.get(field, {})
+            has_field = sorted((value_key(values[key]), key) for key in keys if key in values)
+            ordered_keys = [key for _, key in has_field]
+        else:
+            ordered_keys = [key for key in ordered if key in wanted]
+        found = set(ordered_keys)
+        return ordered_keys + [key for key in keys if key not in found]
+
+class Query(object):
+    """Filter box query, whitespace separated parts that
+    must all match:
+
+        chapter=3 page>=10 has:binary_key source~scan text
+
+    Comparisons use value_key so numbers and roman numerals
+    compare numerically, ~ is a case insensitive substring
+    of the field value and any other part is a text term
+    for TextIndex.
+    """
+    clause_pattern = re.compile(r"^([^=<>!~]+)(>=|<=|!=|=|>|<|~)(.*)$")
+
+    def __init__(self, text):
+        self.text = text
+        self.terms = []
+        self.clauses = []
+        for part in text.split():
+            if part.startswith("has:") and len(part) > 4:
+                self.clauses.append((part[4:], "has", ""))
+                continue
+            clause = self.clause_pattern.match(part)
+            if clause:
+                self.clauses.append(clause.groups())
+            else:
+                self.terms.append(part)
+
+    def __bool__(self):
+        return bool(self.terms or self.clauses)
+
+    def search(self, text_index, field_index):
+        """Return the set of keys matching the query or
+        None if the query is empty"""
+        matches = None
+        if self.terms:
+            matches = text_index.search(" ".join(self.terms))
+        for field, operator, value in self.clauses:
+            if matches is not None and not matches:
+                break
+            keys = field_index.select(field, operator, value)
+            if matches is None:
+                matches = keys
+            else:
+                matches &= keys
+        return matches
+
+    def matches(self, fields, text):
+        """Linear equivalent of search for a single glworb"""
+        if self.terms and not text_matches(" ".join(self.terms), text):
+            return False
+        for field, operator, value in self.clauses:
+            if not self.clause_matches(fields, field, operator, value):
+                return False
+        return True
+
+    @staticmethod
+    def clause_matches(fields, field, operator, value):
+        if field not in fields:
+            return False
+        if operator == "has":
+            return True
+        field_value = fields[field]
+        if operator == "~":
+            return value.lower() in field_value.lower()
+        field_key = value_key(field_value)
+        query_key = value_key(value)
+        if operator == "!=":
+            return field_key != query_key
+        if field_key[0] != query_key[0]:
+            return False
+        if operator == "=":
+            return field_key == query_key
+        elif operator == ">=":
+            return field_key >= query_key
+        elif operator == ">":
+            return field_key > query_key
+        elif operator == "<=":
+            return field_key <= query_key
+        elif operator == "<":
+            return field_key < query_key
+        return False
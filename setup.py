@@ -10,7 +10,7 @@ name="dss_ui",
     include_package_data=True,
     data_files = [("", ["LICENSE.txt"])],
     url="",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=['kivy', 'ma_cli', 'ma_wip', 'lings'],
     dependency_links=["https://github.com/galencm/ma-cli/tarball/master#egg=ma_cli-0.1",
                       "https://github.com/galencm/machinic-wip/tarball/master#egg=ma_wip-0.1",